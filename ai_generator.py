@@ -1,9 +1,13 @@
+import asyncio
 import os
-from typing import Dict
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 # from mistralai import Mistral, UserMessage, SystemMessage
-from openai import OpenAI
 from dotenv import load_dotenv
 import logging
+from llm_provider import AsyncLLMProvider, LLMProvider, LLMError, FatalLLMError
+from completion_cache import CompletionCache, completion_key
+from metrics import registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,25 +17,67 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Initialize OpenAI client with GitHub models endpoint
-endpoint = "https://models.github.ai/inference"
-model_name = "openai/gpt-4.1-nano"
+endpoint = os.getenv("LLM_ENDPOINT", "https://models.github.ai/inference")
+model_name = os.getenv("LLM_MODEL", "openai/gpt-4.1-nano")
 # client = Mistral(api_key=os.getenv("GITHUB_TOKEN"), server_url=endpoint)
-client = OpenAI(
+provider_settings = dict(
     base_url=endpoint,
-    api_key=os.getenv("OPENAI_API_KEY")
+    api_key=os.getenv("OPENAI_API_KEY"),
+    connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("LLM_READ_TIMEOUT", "60")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
 )
+# One provider per process: shared connection pool, explicit timeouts, retries and a circuit breaker
+provider = LLMProvider(max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")), **provider_settings)
+client = provider.client
+# The ASGI app's provider: calls are awaited on the event loop, so one process can hold many more
+# generations in flight than it has threads. It shares the breaker, so both paths see one endpoint health.
+async_provider = AsyncLLMProvider(max_connections=int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", "100")),
+                                  breaker=provider.breaker, **provider_settings)
 
+# Sampling parameters for blog post generation (part of the completion cache key)
+temperature = 0.7
+max_tokens = 2000
 
-def generate_blog_post(keyword: str, seo_data: Dict[str, float]) -> str:
+# Content-addressed completion cache: identical requests are answered from disk without calling the API
+completion_cache = CompletionCache(
+    os.getenv("COMPLETION_CACHE_DB", "completion_cache.db"),
+    ttl_seconds=float(os.getenv("COMPLETION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_bytes=int(float(os.getenv("COMPLETION_CACHE_MAX_MB", "256")) * 1024 * 1024)
+)
+
+
+# LLM instrumentation (exported at /metrics)
+LLM_REQUEST_SECONDS = registry.histogram(
+    "blog_llm_request_duration_seconds", "Duration of LLM calls (full response or whole stream)", ["model", "mode"])
+LLM_TOKENS = registry.counter(
+    "blog_llm_tokens_total", "Tokens reported in response.usage", ["model", "type"])
+LLM_REQUESTS = registry.counter(
+    "blog_llm_requests_total", "Generation requests by how they were served", ["mode", "source"])
+
+
+def record_usage(usage: Any):
+    """Adds a response's token usage (an object or, for stream chunks, a plain dict) to the token counters."""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+        if value:
+            LLM_TOKENS.inc(value, model=model_name, type=kind.split("_")[0])
+
+
+def build_messages(keyword: str, seo_data: Dict[str, float]) -> List[Dict[str, str]]:
     """
-    Generate a blog post using GitHub Models API based on the keyword and SEO data.
+    Build the chat messages used to generate a blog post.
     
     Args:
         keyword (str): The main keyword for the blog post
         seo_data (Dict[str, float]): SEO metrics for the keyword
         
     Returns:
-        str: Generated blog post in Markdown format
+        List[Dict[str, str]]: Chat completion messages (system prompt and user prompt)
     """
     # Construct the prompt
     prompt = f"""Write an engaging and educational blog post about {keyword} that's perfect for learners and general audiences.
@@ -116,39 +162,251 @@ def generate_blog_post(keyword: str, seo_data: Dict[str, float]) -> str:
     **Return only the finished blog post content in Markdown format. Do not include meta-commentary or instructions."""
 
     #  (https://verified-working-link.com) for source to get actual URLs.
+
+    return [
+        {
+            "role": "developer",
+            "content": "You are a professional blog writer specializing in creating SEO-optimized content."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def cached_completion(cache_key: str, keyword: str, mode: str) -> Optional[str]:
+    """Returns the cached completion for ``cache_key`` (counted as a cache-served request), or None."""
+    cached = completion_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Completion cache hit for keyword: {keyword}")
+        LLM_REQUESTS.inc(mode=mode, source="cache")
+    return cached
+
+
+def completion_request(messages: List[Dict[str, str]], max_tokens: int) -> Dict[str, Any]:
+    """The chat completion parameters for ``messages``; all but the stream options are part of the cache key."""
+    return dict(model=model_name, messages=messages, temperature=temperature, max_tokens=max_tokens)
+
+
+def completion_content(response: Any, mode: str, keyword: str, elapsed: float) -> str:
+    """Records a finished completion's metrics and returns its text ("" if the model returned nothing)."""
+    LLM_REQUEST_SECONDS.observe(elapsed, model=model_name, mode=mode)
+    LLM_REQUESTS.inc(mode=mode, source="llm")
+    record_usage(getattr(response, "usage", None))
+    logger.info(f"Generated {mode} for keyword: {keyword} in {elapsed:.2f}s")
+    return response.choices[0].message.content or ""
+
+
+def stream_delta(chunk: Any) -> Optional[str]:
+    """Records a stream chunk's token usage (sent on the last chunk) and returns its text, if any."""
+    record_usage(getattr(chunk, "usage", None))
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+
+def finish_stream(cache_key: str, chunks: List[str], keyword: str, start: float):
+    """Records a finished stream's duration and caches its text; blocking (the completion cache is SQLite)."""
+    elapsed = time.perf_counter() - start
+    LLM_REQUEST_SECONDS.observe(elapsed, model=model_name, mode="stream")
+    if chunks:
+        completion_cache.put(cache_key, "".join(chunks))
+    logger.info(f"Finished streaming blog post for keyword: {keyword} in {elapsed:.2f}s")
+
+
+def complete(messages: List[Dict[str, str]], max_tokens: int, mode: str, keyword: str,
+             force: bool = False, deadline: Optional[float] = None) -> str:
+    """
+    One cached, instrumented chat completion: a whole post, or a part of one (e.g. an outline or a section).
+
+    Args:
+        messages (List[Dict[str, str]]): Chat completion messages
+        max_tokens (int): Completion token limit (part of the cache key)
+        mode (str): Metrics label for the call, e.g. "complete", "outline" or "section"
+        keyword (str): The post's keyword, for logging
+        force (bool): Skip the completion cache and always call the API
+        deadline (Optional[float]): time.monotonic() value the call (with retries) must finish by
+
+    Returns:
+        str: The completion text ("" if the model returned nothing)
+    """
+    cache_key = completion_key(model_name, messages, temperature, max_tokens)
+    if not force:
+        cached = cached_completion(cache_key, keyword, mode)
+        if cached is not None:
+            return cached
+
+    start = time.perf_counter()
+    try:
+        response = provider.chat_completion(deadline=deadline, **completion_request(messages, max_tokens))
+        content = completion_content(response, mode, keyword, time.perf_counter() - start)
+    except LLMError:
+        raise
+    except Exception as e:
+        raise FatalLLMError(f"Error generating {mode} for {keyword}: {str(e)}") from e
+    if content:
+        completion_cache.put(cache_key, content)
+    return content
+
+
+async def complete_async(messages: List[Dict[str, str]], max_tokens: int, mode: str, keyword: str,
+                         force: bool = False, deadline: Optional[float] = None) -> str:
+    """complete for the event loop: the API call is awaited and the completion cache is used from a worker thread."""
+    cache_key = completion_key(model_name, messages, temperature, max_tokens)
+    if not force:
+        cached = await asyncio.to_thread(cached_completion, cache_key, keyword, mode)
+        if cached is not None:
+            return cached
+
+    start = time.perf_counter()
+    try:
+        response = await async_provider.chat_completion(deadline=deadline, **completion_request(messages, max_tokens))
+        content = completion_content(response, mode, keyword, time.perf_counter() - start)
+    except LLMError:
+        raise
+    except Exception as e:
+        raise FatalLLMError(f"Error generating {mode} for {keyword}: {str(e)}") from e
+    if content:
+        await asyncio.to_thread(completion_cache.put, cache_key, content)
+    return content
+
+
+def generate_blog_post(keyword: str, seo_data: Dict[str, float], force: bool = False) -> str:
+    """
+    Generate a blog post using GitHub Models API based on the keyword and SEO data.
     
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+        force (bool): Skip the completion cache and always call the API
+        
+    Returns:
+        str: Generated blog post in Markdown format
+    """
     try:
         logger.info(f"Generating blog post for keyword: {keyword}")
+        return complete(build_messages(keyword, seo_data), max_tokens, "complete", keyword, force=force)
+    except LLMError as e:
+        logger.error(f"Error generating blog post: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error generating blog post: {str(e)}")
+        raise FatalLLMError(f"Error generating blog post: {str(e)}") from e
+
+def stream_blog_post(keyword: str, seo_data: Dict[str, float], force: bool = False) -> Iterator[str]:
+    """
+    Generate a blog post like generate_blog_post, yielding Markdown chunks as the model produces them.
+    
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+        force (bool): Skip the completion cache and always call the API
         
-        # Call GitHub Models API
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "developer",
-                    "content": "You are a professional blog writer specializing in creating SEO-optimized content."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=2000
+    Yields:
+        str: Successive pieces of the blog post; joined together they form the full post
+    """
+    try:
+        messages = build_messages(keyword, seo_data)
+        cache_key = completion_key(model_name, messages, temperature, max_tokens)
+        if not force:
+            cached = cached_completion(cache_key, keyword, "stream")
+            if cached is not None:
+                yield cached
+                return
+
+        logger.info(f"Streaming blog post for keyword: {keyword}")
+        
+        start = time.perf_counter()
+        stream = provider.stream_chat_completion(
+            **completion_request(messages, max_tokens),
+            # Ask for a final chunk carrying token usage (passed through for older SDK versions)
+            extra_body={"stream_options": {"include_usage": True}}
         )
+        LLM_REQUESTS.inc(mode="stream", source="llm")
         
-        # Extract and return the generated content
-        blog_post = response.choices[0].message.content
-        logger.info(f"Successfully generated blog post for keyword: {keyword}")
+        chunks = []
+        for chunk in stream:
+            delta = stream_delta(chunk)
+            if delta:
+                chunks.append(delta)
+                yield delta
         
-        # Replace affiliate link placeholders with dummy URLs
-       
+        finish_stream(cache_key, chunks, keyword, start)
         
-        return blog_post
+    except LLMError as e:
+        logger.error(f"Error streaming blog post: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming blog post: {str(e)}")
+        raise FatalLLMError(f"Error generating blog post: {str(e)}") from e
+
+async def generate_blog_post_async(keyword: str, seo_data: Dict[str, float], force: bool = False) -> str:
+    """
+    generate_blog_post for the event loop: the API call is awaited and the
+    completion cache (SQLite) is read and written in a worker thread.
+    
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+        force (bool): Skip the completion cache and always call the API
         
+    Returns:
+        str: Generated blog post in Markdown format
+    """
+    try:
+        logger.info(f"Generating blog post for keyword: {keyword}")
+        return await complete_async(build_messages(keyword, seo_data), max_tokens, "complete", keyword, force=force)
+    except LLMError as e:
+        logger.error(f"Error generating blog post: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Error generating blog post: {str(e)}")
-        raise Exception(f"Error generating blog post: {str(e)}")
+        raise FatalLLMError(f"Error generating blog post: {str(e)}") from e
+
+async def stream_blog_post_async(keyword: str, seo_data: Dict[str, float], force: bool = False) -> AsyncIterator[str]:
+    """
+    stream_blog_post for the event loop (see generate_blog_post_async).
+    
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+        force (bool): Skip the completion cache and always call the API
+        
+    Yields:
+        str: Successive pieces of the blog post; joined together they form the full post
+    """
+    try:
+        messages = build_messages(keyword, seo_data)
+        cache_key = completion_key(model_name, messages, temperature, max_tokens)
+        if not force:
+            cached = await asyncio.to_thread(cached_completion, cache_key, keyword, "stream")
+            if cached is not None:
+                yield cached
+                return
+
+        logger.info(f"Streaming blog post for keyword: {keyword}")
+        
+        start = time.perf_counter()
+        stream = async_provider.stream_chat_completion(
+            **completion_request(messages, max_tokens),
+            extra_body={"stream_options": {"include_usage": True}}
+        )
+        LLM_REQUESTS.inc(mode="stream", source="llm")
+        
+        chunks = []
+        async for chunk in stream:
+            delta = stream_delta(chunk)
+            if delta:
+                chunks.append(delta)
+                yield delta
+        
+        await asyncio.to_thread(finish_stream, cache_key, chunks, keyword, start)
+        
+    except LLMError as e:
+        logger.error(f"Error streaming blog post: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming blog post: {str(e)}")
+        raise FatalLLMError(f"Error generating blog post: {str(e)}") from e
 
 def check_connection():
     """
@@ -156,8 +414,8 @@ def check_connection():
     """
     try:
         # Attempt a simple API call to verify connection
-        # Using client.models.list() as a simple check
-        client.models.list()
+        # Using the models list endpoint as a simple check
+        provider.list_models()
         return True
     except Exception as e:
         logger.error(f"Connection check failed: {str(e)}")
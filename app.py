@@ -1,18 +1,37 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for
+from flask import Flask, Response, jsonify, request, render_template, redirect, url_for, stream_with_context, make_response, g
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
 import os
+import time
+import logging
 import markdown
 from dotenv import load_dotenv
-from seo_fetcher import get_seo_data
-from ai_generator import generate_blog_post
+from markupsafe import Markup, escape
+from seo_fetcher import get_seo_data, get_seo_data_many, provider as seo_provider
+from ai_generator import generate_blog_post, stream_blog_post, provider as llm_provider, async_provider as async_llm_provider, completion_cache
+from sectioned_generator import generate_sectioned_post
+from llm_provider import CircuitOpenError
+from post_store import PostStore, PostsMapping, SNIPPET_START, SNIPPET_END
+from review_store import ReviewStore
+from post_parser import parse_post, RENDER_VERSION
+from http_cache import make_etag, directory_fingerprint, is_not_modified, add_validators, mark_fresh_write
+from jobs import JobQueue, QueueFullError
+from batch_generator import load_keywords, run_batch
+from site_export import ExportQueue, SiteExporter
+from similarity import TopicIndex
+from metrics import registry
 import json
+import fcntl
 import re # Import re for robust sanitization
 
 
 # Load environment variables
 load_dotenv()
 
+# LOG_LEVEL=DEBUG shows per-request detail; at INFO and above those calls return before formatting anything
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
 # Custom Jinja2 filter for number localization
@@ -22,33 +41,45 @@ def to_localized_string_filter(value):
 
 # Directory for storing generated posts and reviews
 GENERATED_POSTS_DIR = "generated_posts"
-REVIEWS_DIR = "reviews"
-BLOG_POSTS_DB = "blog_posts_db.json" # JSON file for key-value storage
+REVIEWS_DIR = "reviews" # Legacy per-post JSON review files, migrated into the review store on startup
+REVIEWS_STORE = os.getenv("REVIEWS_STORE", "reviews.db") # SQLite review store
+BLOG_POSTS_DB = "blog_posts_db.json" # Legacy JSON file, migrated into the post store on startup
+BLOG_POSTS_STORE = os.getenv("BLOG_POSTS_STORE", "blog_posts.db") # SQLite post store
+POST_STORE_MMAP_MB = int(os.getenv("POST_STORE_MMAP_MB", "0")) # Memory-map this much of the post store (0: off)
+RENDERED_CACHE_SIZE = int(os.getenv("RENDERED_CACHE_SIZE", "256")) # Renderings of hot posts kept decoded per process
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db") # Persistent generation job table
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2")) # Job worker threads per process
+# Jobs running at once across every process sharing JOBS_DB (the LLM sees at most this many job generations)
+MAX_RUNNING_JOBS = int(os.getenv("MAX_RUNNING_JOBS", str(GENERATION_WORKERS)))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "100"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600))) # Finished jobs are deleted after this
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3")) # A job interrupted this many times (e.g. its worker died) fails
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", "scheduler.lock") # Held by the one process running cron jobs
+STATIC_EXPORT_DIR = os.getenv("STATIC_EXPORT_DIR") # Pre-rendered pages for nginx; export is off when unset
+METRICS_DIR = os.getenv("METRICS_DIR") # Shared by gunicorn workers so /metrics reports server-wide totals
+BATCH_KEYWORDS_FILE = os.getenv("BATCH_KEYWORDS_FILE") # Keyword list for the nightly batch job (CSV/JSONL/text)
+DEFAULT_POSTS_PER_PAGE = 20
+MAX_POSTS_PER_PAGE = 100
+REVIEWS_ON_POST_PAGE = 20 # Newest reviews shown under a post; the rest are on /reviews/<keyword>
+DEFAULT_REVIEWS_PER_PAGE = 20
+MAX_REVIEWS_PER_PAGE = 100
+DEFAULT_SEARCH_RESULTS_PER_PAGE = 10
+MAX_SEARCH_RESULTS_PER_PAGE = 50
+# Topic similarity (0-1, see similarity.py) at which a keyword reuses an existing post instead of
+# generating a new one; "wireless earbuds 2026" vs "best wireless earbuds" is 1.0, a topic with an extra
+# or different word is 0.0, and lower thresholds accept more misspelled words. 0 disables the check.
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.9"))
+# Generate posts as an outline plus concurrently written sections (sectioned_generator.py) instead of one long
+# completion. /generate can override it per request with ?sectioned=true|false; streaming is always single-shot.
+SECTIONED_GENERATION = os.getenv("SECTIONED_GENERATION", "false").lower() in ('1', 'true', 'yes')
+HTTP_MICRO_CACHE_SECONDS = int(os.getenv("HTTP_MICRO_CACHE_SECONDS", "1")) # s-maxage for nginx's page micro-cache
+# Endpoints that change posts or reviews; their responses make nginx skip the micro-cache for that client
+WRITE_ENDPOINTS = {'generate_post', 'generate_post_stream', 'create_job', 'submit_review', 'delete_post', 'delete_all_posts'}
 
 # Ensure directories exist
 os.makedirs(GENERATED_POSTS_DIR, exist_ok=True)
 os.makedirs(REVIEWS_DIR, exist_ok=True)
 
-# Helper functions for JSON database
-def load_blog_posts():
-    """Loads blog posts from the JSON database file."""
-    if not os.path.exists(BLOG_POSTS_DB):
-        return {}
-    try:
-        with open(BLOG_POSTS_DB, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading blog posts database {BLOG_POSTS_DB}: {str(e)}")
-        return {}
-
-def save_blog_posts(posts_data):
-    """Saves blog posts to the JSON database file."""
-    try:
-        with open(BLOG_POSTS_DB, 'w', encoding='utf-8') as f:
-            json.dump(posts_data, f, indent=4)
-    except Exception as e:
-        print(f"Error saving blog posts database {BLOG_POSTS_DB}: {str(e)}")
-
 def sanitize_keyword(keyword):
     """Sanitizes keyword for use as a filename and dictionary key."""
     # Replace spaces and potential path separators with hyphens, make lowercase
@@ -64,128 +95,390 @@ def sanitize_keyword(keyword):
         return "generated-post" # Fallback if keyword sanitizes to empty
     return sanitized
 
-def extract_title_from_markdown(markdown_content):
-    """Extracts the H1 title from markdown content, or returns a default."""
-    if not markdown_content:
-        return "Untitled Post"
-        
-    lines = markdown_content.strip().split('\n')
-    for line in lines[:15]: # Check first 15 lines for performance
-        if line.strip().startswith('# '):
-            return line.strip()[2:].strip() # Remove '# ' and whitespace
-            
-    return "Untitled Post" # Return default if no H1 found
+def post_title(markdown_content):
+    """The title parse_post finds, so listings and search show the same title as the post page (stored posts take it from render_post_content)."""
+    return parse_post(markdown_content)['title']
+
+def render_post_content(blog_post_content):
+    """Parses a post once (see post_parser) and renders its body without the sources section to HTML."""
+    parsed = parse_post(blog_post_content)
+    blog_post_html = markdown.markdown(parsed['body'], extensions=["fenced_code", "nl2br"])
+
+    return {
+        'version': RENDER_VERSION,
+        'html': blog_post_html,
+        'sources': parsed['sources'],
+        'title': parsed['title'],
+        'outline': parsed['outline'],
+        'links': parsed['links'],
+        'word_count': parsed['word_count'],
+    }
+
+# Post storage: SQLite in WAL mode, one row per sanitized keyword. Posts are rendered
+# when they are saved, so page views read the finished HTML instead of parsing Markdown.
+post_store = PostStore(BLOG_POSTS_STORE, title_fn=post_title, render_fn=render_post_content,
+                       mmap_size=POST_STORE_MMAP_MB * 1024 * 1024, title_version=RENDER_VERSION,
+                       rendered_cache_size=RENDERED_CACHE_SIZE)
+post_store.migrate_from_json(BLOG_POSTS_DB)
+
+# Review storage: append-only rows per post, with a cached count per post
+review_store = ReviewStore(REVIEWS_STORE)
+review_store.migrate_from_json_dir(REVIEWS_DIR)
+
+# Folded into page ETags so template changes invalidate pages cached by browsers and nginx
+TEMPLATE_FINGERPRINT = directory_fingerprint(os.path.join(app.root_path, app.template_folder))
+
+# Instrumentation, exported in Prometheus text format at /metrics
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "blog_http_request_duration_seconds", "Request latency by route", ["route", "method"])
+HTTP_REQUESTS = registry.counter(
+    "blog_http_requests_total", "Requests by route and status", ["route", "method", "status"])
+VIEW_POST_STAGE_SECONDS = registry.histogram(
+    "blog_view_post_stage_seconds", "Time spent in each stage of rendering a post page", ["stage"])
+VIEW_TIME_RENDERS = registry.counter(
+    "blog_post_view_renders_total", "Post views that rendered Markdown because no current stored rendering existed")
+GENERATION_STAGE_SECONDS = registry.histogram(
+    "blog_generation_stage_seconds", "Time spent in each stage of generating a post", ["stage"])
+DUPLICATES_SKIPPED = registry.counter(
+    "blog_generation_duplicates_total", "Generations skipped because a post on the same topic exists", ["source"])
+
+def cache_stats():
+    """Stats of every cache whose hit rate is exported, by cache name."""
+    return {'completion': completion_cache.stats(), 'seo': seo_provider.stats()}
+
+registry.callback("blog_cache_hits_total", "Cache hits", "counter",
+                  lambda: {(name,): stats['hits'] for name, stats in cache_stats().items()}, ["cache"])
+registry.callback("blog_cache_misses_total", "Cache misses", "counter",
+                  lambda: {(name,): stats['misses'] for name, stats in cache_stats().items()}, ["cache"])
+registry.callback("blog_cache_entries", "Entries held by each cache", "gauge",
+                  lambda: {(name,): stats['entries'] for name, stats in cache_stats().items()}, ["cache"])
+registry.callback("blog_llm_provider_events_total", "LLM provider calls, retries and failures (sync and async clients)", "counter",
+                  lambda: {(event,): llm_provider.stats()[event] + async_llm_provider.stats()[event]
+                           for event in ('calls', 'retries', 'failures')}, ["event"])
+registry.callback("blog_llm_breaker_open", "1 while the LLM circuit breaker is not closed", "gauge",
+                  lambda: {(): float(llm_provider.breaker.stats()['state'] != 'closed')})
+
+if METRICS_DIR:
+    registry.share(METRICS_DIR)
+
+# Adapter functions kept for callers written against the old JSON database
+def load_blog_posts():
+    """Returns a dict-like, write-through view of all blog posts (bodies are loaded lazily per key)."""
+    return PostsMapping(post_store)
+
+def save_blog_posts(posts_data):
+    """Persists a posts dictionary. Write-through views are already saved; plain dicts replace the store."""
+    if isinstance(posts_data, PostsMapping):
+        return
+    try:
+        post_store.replace_all(dict(posts_data))
+    except Exception as e:
+        logger.error("Error saving blog posts to %s: %s", BLOG_POSTS_STORE, e)
 
 # Initialize scheduler
 scheduler = BackgroundScheduler()
 
+def post_payload(sanitized_keyword, seo_data, blog_post_content):
+    """The API payload sent back to the frontend for a post."""
+    # Convert Markdown to HTML for display
+    blog_post_html = markdown.markdown(blog_post_content, extensions=["fenced_code", "nl2br"])
+
+    return {
+        "blog_post": blog_post_content,
+        "blog_post_html": blog_post_html,
+        "filename": sanitized_keyword,
+        "seo_data": seo_data  # Pass SEO data to the frontend
+    }
+
+def store_generated_post(keyword, seo_data, blog_post_content):
+    """Saves a freshly generated post and returns the API payload sent back to the frontend."""
+    sanitized_keyword = sanitize_keyword(keyword)
+
+    # Save the generated blog post with the SEO data it was written for
+    post_store.put(sanitized_keyword, blog_post_content, seo_data=seo_data)
+    queue_static_export([sanitized_keyword])
+
+    return post_payload(sanitized_keyword, seo_data, blog_post_content)
+
+def find_existing_post(keyword):
+    """Returns {'keyword', 'similarity'} of the stored post closest to the keyword's topic, if it reaches DUPLICATE_THRESHOLD."""
+    if DUPLICATE_THRESHOLD <= 0:
+        return None
+    with GENERATION_STAGE_SECONDS.time(stage='duplicate_check'):
+        matches = post_store.find_similar(keyword, DUPLICATE_THRESHOLD, limit=1)
+    return matches[0] if matches else None
+
+def reuse_existing_post(keyword, source):
+    """Returns the payload of an existing post on the keyword's topic (marked with duplicate_of), or None."""
+    match = find_existing_post(keyword)
+    content = post_store.get(match['keyword']) if match else None
+    if content is None:
+        return None
+    DUPLICATES_SKIPPED.inc(source=source)
+    logger.info("Skipped generating '%s': post '%s' covers the same topic (similarity %.2f)",
+                keyword, match['keyword'], match['similarity'])
+    payload = post_payload(match['keyword'], post_store.get_seo_data(match['keyword']), content)
+    payload.update(duplicate_of=match['keyword'], similarity=match['similarity'])
+    return payload
+
+def start_generation(keyword, force=False, source='generate'):
+    """
+    The steps before a generation's LLM call, shared by the sync routes and asgi.py's async ones.
+
+    Returns (payload, None) when an existing post covers the keyword's topic (skipped when forced),
+    else (None, seo_data) for the LLM call.
+    """
+    if not force:
+        existing = reuse_existing_post(keyword, source)
+        if existing is not None:
+            return existing, None
+    with GENERATION_STAGE_SECONDS.time(stage='seo_fetch'):
+        return None, get_seo_data(keyword)
+
+def finish_generation(keyword, seo_data, blog_post_content):
+    """The step after a generation's LLM call: saves the post and returns its API payload."""
+    with GENERATION_STAGE_SECONDS.time(stage='persist'):
+        return store_generated_post(keyword, seo_data, blog_post_content)
+
+def generate_and_store_post(keyword, force=False, source='generate', sectioned=None):
+    """Fetches SEO data, generates a post for the keyword, saves it and returns the API payload."""
+    if sectioned is None:
+        sectioned = SECTIONED_GENERATION
+    # A keyword whose topic an existing post already covers gets that post, unless forced
+    existing, seo_data = start_generation(keyword, force, source)
+    if existing is not None:
+        return existing
+    with GENERATION_STAGE_SECONDS.time(stage='llm_call'):
+        generate = generate_sectioned_post if sectioned else generate_blog_post
+        blog_post_content = generate(keyword, seo_data, force=force)
+    return finish_generation(keyword, seo_data, blog_post_content)
+
+# Background generation jobs (POST /jobs), persisted so queued work survives restarts
+job_queue = JobQueue(JOBS_DB, handler=lambda keyword: generate_and_store_post(keyword, source='job'),
+                     key_fn=sanitize_keyword,
+                     max_workers=GENERATION_WORKERS, max_pending=MAX_PENDING_JOBS,
+                     max_running=MAX_RUNNING_JOBS, retention=JOB_RETENTION_SECONDS,
+                     max_attempts=JOB_MAX_ATTEMPTS)
+
 def generate_daily_post():
     """Function to generate a daily blog post with a predefined keyword"""
     keyword = "wireless earbuds"  # Predefined keyword
     try:
-        seo_data = get_seo_data(keyword)
-        blog_post = generate_blog_post(keyword, seo_data)
+        result = generate_and_store_post(keyword, source='daily')
 
-        sanitized_keyword = sanitize_keyword(keyword)
-        
-        # Load existing posts, add/update the new post, and save
-        posts_data = load_blog_posts()
-        posts_data[sanitized_keyword] = blog_post
-        save_blog_posts(posts_data)
-
-        print(f"Generated daily post for keyword: {keyword}")
+        if 'duplicate_of' not in result:
+            logger.info("Generated daily post for keyword: %s", keyword)
+    except Exception as e:
+        logger.error("Error generating daily post: %s", e)
+
+def commit_generated_posts(posts, seo_data):
+    """Saves a batch of generated posts and their SEO data in one transaction and updates the static export."""
+    with GENERATION_STAGE_SECONDS.time(stage='persist'):
+        post_store.put_many(posts, seo_data)
+    queue_static_export(list(posts))
+
+def timed_generate_blog_post(keyword, seo_data, **kwargs):
+    """generate_blog_post, recorded as the llm_call generation stage."""
+    with GENERATION_STAGE_SECONDS.time(stage='llm_call'):
+        return generate_blog_post(keyword, seo_data, **kwargs)
+
+def timed_get_seo_data_many(keywords):
+    """get_seo_data_many, recorded as the seo_fetch generation stage."""
+    with GENERATION_STAGE_SECONDS.time(stage='seo_fetch'):
+        return get_seo_data_many(keywords)
+
+def batch_duplicate_filter():
+    """Returns a find_duplicate callable for one batch run: checks stored posts, then keywords accepted earlier in the run."""
+    accepted = TopicIndex()
+
+    def find_duplicate(keyword):
+        match = find_existing_post(keyword) or accepted.find(keyword, DUPLICATE_THRESHOLD)
+        if match is None:
+            accepted.add(sanitize_keyword(keyword), keyword)
+            return None
+        DUPLICATES_SKIPPED.inc(source='batch')
+        return match['keyword']
+
+    return find_duplicate
+
+def run_batch_generation(keywords, force=False, **options):
+    """Generates posts for a list of keywords with bounded concurrency and rate limits (see batch_generator.run_batch)."""
+    # Unless forced, keywords whose topic a stored post or an earlier keyword covers are skipped
+    find_duplicate = batch_duplicate_filter() if not force and DUPLICATE_THRESHOLD > 0 else None
+    return run_batch(keywords, generate=timed_generate_blog_post, get_seo_many=timed_get_seo_data_many,
+                     commit=commit_generated_posts, key_fn=sanitize_keyword, find_duplicate=find_duplicate, **options)
+
+def generate_batch_posts():
+    """Scheduled job: generates posts for every keyword in BATCH_KEYWORDS_FILE, resuming today's run if it crashed."""
+    if not BATCH_KEYWORDS_FILE or not os.path.exists(BATCH_KEYWORDS_FILE):
+        return
+    try:
+        checkpoint_path = f"{BATCH_KEYWORDS_FILE}.{datetime.now().strftime('%Y-%m-%d')}.checkpoint.jsonl"
+        summary = run_batch_generation(
+            load_keywords(BATCH_KEYWORDS_FILE),
+            max_concurrency=int(os.getenv("BATCH_CONCURRENCY", "4")),
+            requests_per_minute=float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "60")) or None,
+            tokens_per_minute=float(os.getenv("BATCH_TOKENS_PER_MINUTE", "0")) or None,
+            checkpoint_path=checkpoint_path,
+        )
+        logger.info("Batch generation finished: %s", summary)
     except Exception as e:
-        print(f"Error generating daily post: {str(e)}")
+        logger.error("Error running batch generation: %s", e)
+
+def cacheable(response, etag, last_modified):
+    """Adds ETag/Last-Modified/Cache-Control to a page response (see http_cache)."""
+    return add_validators(response, etag, last_modified, shared_max_age=HTTP_MICRO_CACHE_SECONDS)
+
+@app.before_request
+def start_request_timer():
+    """Remembers when the request started, for the latency histogram."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Records latency and status per route (the URL rule, so /post/<filename> is one series)."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.after_request
+def bypass_micro_cache_after_write(response):
+    """Gives clients that just changed something read-your-writes past nginx's micro-cache."""
+    if request.endpoint in WRITE_ENDPOINTS and response.status_code < 400:
+        mark_fresh_write(response, HTTP_MICRO_CACHE_SECONDS)
+    return response
 
 @app.route('/')
 def home():
     """Render the main page with a list of blog posts"""
-    posts_data = load_blog_posts()
-    posts = []
-    # Sort keywords by descending order to show latest first (assuming newer keywords are added later)
-    sorted_keywords = sorted(posts_data.keys(), reverse=True)
+    # Any post write or delete bumps the store version, so it validates every listing page
+    store_version = post_store.version()
+    etag = make_etag('home', store_version['version'], TEMPLATE_FINGERPRINT)
+    if is_not_modified(request, etag, store_version['changed_at']):
+        return cacheable(Response(status=304), etag, store_version['changed_at'])
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', DEFAULT_POSTS_PER_PAGE, type=int), 1), MAX_POSTS_PER_PAGE)
+    response = make_response(render_home_page(page, per_page))
+    return cacheable(response, etag, store_version['changed_at'])
+
+def render_home_page(page=1, per_page=DEFAULT_POSTS_PER_PAGE):
+    """Renders one page of the post listing to HTML (shared by the / view and the static export)."""
+    # Pagination over the listing index; post bodies are never loaded here
+    total_posts = post_store.count()
+    total_pages = max((total_posts + per_page - 1) // per_page, 1)
 
-    for keyword in sorted_keywords:
-        content = posts_data[keyword]
-        title = extract_title_from_markdown(content)
+    posts = []
+    # Latest first, by creation time
+    for entry in post_store.list_posts(offset=(page - 1) * per_page, limit=per_page):
+        keyword = entry['keyword']
+        title = entry['title']
 
         # If no H1 found, use keyword as title
         if title == "Untitled Post":
              title = keyword.replace("-", " ").replace("_", " ")
 
         posts.append({'filename': keyword, 'title': title}) # Use keyword as filename/identifier
-        print(f"DEBUG HOME: Generating link for keyword: {keyword}, URL: {url_for('view_post', filename=keyword)}") # DEBUG: Print generated URL
 
-    return render_template('index.html', posts=posts)
+    pagination = {'page': page, 'per_page': per_page, 'total_pages': total_pages, 'total_posts': total_posts}
+    return render_template('index.html', posts=posts, pagination=pagination)
 
 @app.route('/post/<filename>') # filename will be the keyword
 def view_post(filename):
     """Render a single blog post with reviews"""
-    print(f"Received request for post with filename: {filename}") # Added logging
-    print(f"DEBUG VIEW_POST: Received filename: {filename}") # DEBUG: Print received filename
+    logger.debug("Received request for post with filename: %s", filename)
     keyword = filename # Use filename as keyword
 
     if not keyword:
-        print("Error: Received empty keyword for view_post") # Added logging
-        print("DEBUG VIEW_POST: Keyword is empty.") # DEBUG: Check if keyword is empty
+        logger.warning("Received empty keyword for view_post")
         return "Post not found (empty keyword)", 404
 
-    posts_data = load_blog_posts()
-
-    blog_post_content = posts_data.get(keyword)
-
-    if not blog_post_content:
-        print(f"Error: Post content not found for keyword: {keyword}") # Added logging
-        print(f"DEBUG VIEW_POST: Post content not found for keyword: {keyword}") # DEBUG: Check if post content is found
+    # Validators come from the post's content hash and review version, so a repeat visit
+    # is answered with 304 after two indexed lookups, before the body is loaded or rendered
+    post_info = post_store.get_info(keyword)
+    if post_info is None:
+        logger.debug("Post not found for keyword: %s", keyword)
         return "Post not found", 404
+    review_summary = review_store.summary(keyword)
+    etag = make_etag('post', keyword, post_info['content_hash'], review_summary['version'],
+                     post_info['has_seo_data'], RENDER_VERSION, TEMPLATE_FINGERPRINT)
+    last_modified = max(post_info['updated_at'], review_summary['updated_at'])
+    # A post still without SEO data is rendered, which retries the backfill
+    if post_info['has_seo_data'] and is_not_modified(request, etag, last_modified):
+        return cacheable(Response(status=304), etag, last_modified)
+
+    post_html = render_post_page(keyword, review_summary, post_info['content_hash'])
+    if post_html is None:
+        logger.debug("Post content not found for keyword: %s", keyword)
+        return "Post not found", 404
+    if not post_info['has_seo_data'] and (post_store.get_info(keyword) or {}).get('has_seo_data'):
+        # The backfill just succeeded, so this page has the SEO panel
+        etag = make_etag('post', keyword, post_info['content_hash'], review_summary['version'],
+                         True, RENDER_VERSION, TEMPLATE_FINGERPRINT)
+    return cacheable(make_response(post_html), etag, last_modified)
+
+def render_post_page(keyword, review_summary=None, content_hash=None):
+    """Renders a post page to HTML (shared by view_post and the static export); None if the post is missing."""
+    # HTML, sources and title were rendered when the post was saved
+    with VIEW_POST_STAGE_SECONDS.time(stage='db_load'):
+        rendered = post_store.get_rendered(keyword, content_hash)
+    if rendered is None or rendered.get('version') != RENDER_VERSION:
+        # Posts saved before that (or by an older pipeline) are rendered once and stored
+        with VIEW_POST_STAGE_SECONDS.time(stage='db_load'):
+            blog_post_content = post_store.get(keyword)
+        if not blog_post_content:
+            return None
+        with VIEW_POST_STAGE_SECONDS.time(stage='render'):
+            rendered = render_post_content(blog_post_content)
+        post_store.set_rendered(keyword, blog_post_content, rendered)
+        VIEW_TIME_RENDERS.inc()
+    if review_summary is None:
+        review_summary = review_store.summary(keyword)
+
+    blog_post_html = rendered['html']
+    sources = rendered['sources']
+
+    # SEO data is captured at generation time; posts saved before that are backfilled once
+    try:
+        with VIEW_POST_STAGE_SECONDS.time(stage='seo_fetch'):
+            seo_data = post_store.get_seo_data(keyword)
+            if seo_data is None:
+                seo_data = get_seo_data(keyword.replace("-", " "))
+                post_store.set_seo_data(keyword, seo_data)
+                # The exported page (and any ETag a client holds) may be one rendered without it
+                queue_static_export([keyword])
+    except Exception as e:
+        logger.error("Error loading SEO data for %s: %s", keyword, e)
+        # Render without the SEO panel; a later view tries the backfill again
+        seo_data = None
 
-    # Extract sources from the blog post content
-    sources = []
-    sources_section_match = re.search(r'### 6\. Sources.*?(##.*|$)\n', blog_post_content, re.DOTALL)
-    if sources_section_match:
-        sources_text = sources_section_match.group(0)
-        # Regex to find Source Title: (URL)
-        source_matches = re.findall(r'-\s*(.*?):\s*((https?://\S+))\n', sources_text)
-        for title, url in source_matches:
-            sources.append({'title': title.strip(), 'url': url.strip()})
-
-        # Remove the sources section from the main content
-        blog_post_content_without_sources = blog_post_content[:sources_section_match.start()] + blog_post_content[sources_section_match.end():]
-    else:
-        # If no sources section found, use the original content
-        blog_post_content_without_sources = blog_post_content
-
-    # Convert Markdown to HTML (of content without sources)
-    blog_post_html = markdown.markdown(blog_post_content_without_sources, extensions=["fenced_code", "nl2br"])
-
-    # Get SEO data for the post
-    seo_data = get_seo_data(keyword)
-
-    # Load reviews - review filenames are based on the keyword now
-    reviews_filepath = os.path.join(REVIEWS_DIR, f"{keyword}_reviews.json") # Renamed review file format
-    reviews = []
-    if os.path.exists(reviews_filepath):
-        try:
-            with open(reviews_filepath, "r", encoding="utf-8") as f:
-                reviews = json.load(f)
-        except Exception as e:
-            print(f"Error loading reviews for {keyword}: {str(e)}")
-            # Continue without reviews if loading fails
-            reviews = []
+    # Newest reviews only; the full list is paginated on the reviews page
+    try:
+        with VIEW_POST_STAGE_SECONDS.time(stage='reviews_load'):
+            reviews = review_store.list(keyword, limit=REVIEWS_ON_POST_PAGE)
+        review_count = review_summary['count']
+    except Exception as e:
+        logger.error("Error loading reviews for %s: %s", keyword, e)
+        # Continue without reviews if loading fails
+        reviews = []
+        review_count = 0
 
     # Determine title for the view page - prioritize H1 if available
-    view_title = extract_title_from_markdown(blog_post_content)
+    view_title = rendered['title']
     if view_title == "Untitled Post":
          view_title = keyword.replace("-", " ").replace("_", " ") # Fallback to keyword
 
     # Pass extracted sources and SEO data to the template
-    return render_template('post.html', title=view_title, post_html=blog_post_html, reviews=reviews, filename=keyword, sources=sources, seo_data=seo_data)
+    with VIEW_POST_STAGE_SECONDS.time(stage='template_render'):
+        return render_template('post.html', title=view_title, post_html=blog_post_html, reviews=reviews, review_count=review_count, filename=keyword, sources=sources, seo_data=seo_data)
 
 @app.route('/submit_review/<filename>', methods=['POST'])
 def submit_review(filename):
     """Handle submission of reviews"""
     keyword = filename # Use filename as keyword
-    reviews_filepath = os.path.join(REVIEWS_DIR, f"{keyword}_reviews.json") # Renamed review file format
     reviewer_name = request.form.get('name')
     review_content = request.form.get('review')
 
@@ -199,29 +492,27 @@ def submit_review(filename):
         'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
 
-    reviews = []
-    if os.path.exists(reviews_filepath):
-        try:
-            with open(reviews_filepath, "r", encoding="utf-8") as f:
-                reviews = json.load(f)
-        except Exception as e:
-             print(f"Error loading existing reviews for {keyword}: {str(e)}")
-             # Start with an empty list if loading fails
-             reviews = []
-
-    reviews.append(new_review)
-
+    # A single-row append: concurrent submissions never overwrite each other
     try:
-        with open(reviews_filepath, "w", encoding="utf-8") as f:
-            json.dump(reviews, f, indent=4)
+        review_store.add(keyword, new_review)
     except Exception as e:
-         print(f"Error saving new review for {keyword}: {str(e)}")
+         logger.error("Error saving new review for %s: %s", keyword, e)
          # Continue, but the review won't be saved.
-
+    queue_static_export([keyword])
 
     # Redirect back to the post page
     return redirect(url_for('view_post', filename=keyword))
 
+def is_forced(args=None):
+    """True when the request (or the given query parameters) asks for a fresh generation (?force=true): no completion cache, no duplicate check."""
+    args = request.args if args is None else args
+    return args.get('force', '').lower() in ('1', 'true', 'yes')
+
+def is_sectioned(args=None):
+    """Whether to generate section by section: ?sectioned=true|false, defaulting to SECTIONED_GENERATION."""
+    value = (request.args if args is None else args).get('sectioned')
+    return SECTIONED_GENERATION if value is None else value.lower() in ('1', 'true', 'yes')
+
 # Endpoint to generate a blog post for a given keyword (used by frontend)
 @app.route('/generate', methods=['GET'])
 def generate_post():
@@ -229,117 +520,293 @@ def generate_post():
     if not keyword:
         return jsonify({"error": "Keyword is required"}), 400
 
-    sanitized_keyword = sanitize_keyword(keyword)
-    
     try:
-        # Generate blog post and get SEO data
-        seo_data = get_seo_data(keyword)
-        blog_post_content = generate_blog_post(keyword, seo_data)
-
-        # Save the generated blog post
-        posts_data = load_blog_posts()
-        posts_data[sanitized_keyword] = blog_post_content
-        save_blog_posts(posts_data)
-
-        # Convert Markdown to HTML for display
-        blog_post_html = markdown.markdown(blog_post_content, extensions=["fenced_code", "nl2br"])
-
-        return jsonify({
-            "blog_post": blog_post_content,
-            "blog_post_html": blog_post_html,
-            "filename": sanitized_keyword,
-            "seo_data": seo_data  # Pass SEO data to the frontend
-        })
+        return jsonify(generate_and_store_post(keyword, force=is_forced(), sectioned=is_sectioned()))
+    except CircuitOpenError as e:
+        # The LLM endpoint is known to be down: fail fast instead of tying up the worker
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
-        print(f"Error generating blog post: {e}")
+        logger.error("Error generating blog post: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def sse_event(data, event=None):
+    """Formats one Server-Sent Events message with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+# Streaming variant of /generate: forwards tokens as Server-Sent Events, then saves the post once
+@app.route('/generate/stream', methods=['GET'])
+def generate_post_stream():
+    keyword = request.args.get('keyword')
+    if not keyword:
+        return jsonify({"error": "Keyword is required"}), 400
+
+    force = is_forced()
+
+    def events():
+        try:
+            existing, seo_data = start_generation(keyword, force, 'stream')
+            if existing is not None:
+                yield sse_event(existing, event="done")
+                return
+            chunks = []
+            # Includes time the client takes to read the stream, like the LLM call itself does
+            with GENERATION_STAGE_SECONDS.time(stage='llm_call'):
+                for chunk in stream_blog_post(keyword, seo_data, force=force):
+                    chunks.append(chunk)
+                    yield sse_event({"delta": chunk})
+            yield sse_event(finish_generation(keyword, seo_data, "".join(chunks)), event="done")
+        except Exception as e:
+            logger.error("Error streaming blog post: %s", e)
+            yield sse_event({"error": str(e)}, event="error")
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Tell nginx not to buffer the stream
+    })
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a background generation job and return its id immediately."""
+    payload = request.get_json(silent=True) or {}
+    keyword = payload.get('keyword') or request.form.get('keyword') or request.args.get('keyword')
+    if not keyword:
+        return jsonify({"error": "Keyword is required"}), 400
+
+    try:
+        job, created = job_queue.submit(keyword)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({
+        "job_id": job['id'],
+        "status": job['status'],
+        "deduplicated": not created,
+        "status_url": url_for('get_job', job_id=job['id'])
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report the status of a generation job, including its result once done."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
 @app.route('/delete_all_posts', methods=['POST'])
 def delete_all_posts():
     """Endpoint to delete all generated blog posts and reviews."""
     try:
-        # Load existing posts
-        posts_data = load_blog_posts()
-
-        # Get list of keywords (review filenames) before clearing posts_data
-        keywords_to_delete = list(posts_data.keys())
-
-        # Delete all posts from the database
-        posts_data.clear()
-        save_blog_posts(posts_data)
+        # Delete all posts from the database, keeping the keywords (legacy review filenames)
+        keywords_to_delete = post_store.clear()
+        review_store.clear()
 
-        # Delete all associated review files
+        # Delete any leftover legacy review files
         for keyword in keywords_to_delete:
             reviews_filepath = os.path.join(REVIEWS_DIR, f"{keyword}_reviews.json")
             if os.path.exists(reviews_filepath):
                 os.remove(reviews_filepath)
 
-        print("All generated posts and reviews deleted.")
+        queue_static_export()
+
+        logger.info("All generated posts and reviews deleted.")
         return jsonify({"success": True, "message": "All posts deleted"}), 200
     except Exception as e:
-        print(f"Error deleting all posts: {str(e)}")
+        logger.error("Error deleting all posts: %s", e)
         return jsonify({"success": False, "message": f"Error deleting posts: {str(e)}"}), 500
 
 @app.route('/delete_post/<keyword>', methods=['POST'])
 def delete_post(keyword):
     """Endpoint to delete a specific blog post and its reviews by keyword."""
     try:
-        # Load existing posts
-        posts_data = load_blog_posts()
-
-        # Check if the keyword exists
-        if keyword not in posts_data:
-            return jsonify({"success": False, "message": "Post not found"}), 404
-
         # Delete the post from the database
-        del posts_data[keyword]
-        save_blog_posts(posts_data)
+        if not post_store.delete(keyword):
+            return jsonify({"success": False, "message": "Post not found"}), 404
+        review_store.delete(keyword)
 
-        # Delete the associated review file if it exists
+        # Delete the leftover legacy review file if it exists
         reviews_filepath = os.path.join(REVIEWS_DIR, f"{keyword}_reviews.json")
         if os.path.exists(reviews_filepath):
             os.remove(reviews_filepath)
+        queue_static_export([keyword])
 
-        print(f"Post and reviews for keyword \'{keyword}\' deleted.")
+        logger.info("Post and reviews for keyword '%s' deleted.", keyword)
         return jsonify({"success": True, "message": f"Post \'{keyword}\' deleted"}), 200
     except Exception as e:
-        print(f"Error deleting post \'{keyword}\': {str(e)}")
+        logger.error("Error deleting post '%s': %s", keyword, e)
         return jsonify({"success": False, "message": f"Error deleting post: {str(e)}"}), 500
 
 @app.route('/reviews/<keyword>')
 def view_reviews(keyword):
     """Render a page showing only reviews for a specific post."""
-    print(f"Received request for reviews with keyword: {keyword}") # Added logging
+    logger.debug("Received request for reviews with keyword: %s", keyword)
 
     if not keyword:
-        print("Error: Received empty keyword for view_reviews") # Added logging
+        logger.warning("Received empty keyword for view_reviews")
         return "Reviews not found (empty keyword)", 404
 
-    # Load reviews - review filenames are based on the keyword
-    reviews_filepath = os.path.join(REVIEWS_DIR, f"{keyword}_reviews.json")
-    reviews = []
-    if os.path.exists(reviews_filepath):
-        try:
-            with open(reviews_filepath, "r", encoding="utf-8") as f:
-                reviews = json.load(f)
-        except Exception as e:
-            print(f"Error loading reviews for {keyword}: {str(e)}")
-            # Continue without reviews if loading fails
-            reviews = []
+    review_summary = review_store.summary(keyword)
+    etag = make_etag('reviews', keyword, review_summary['version'], TEMPLATE_FINGERPRINT)
+    if is_not_modified(request, etag, review_summary['updated_at']):
+        return cacheable(Response(status=304), etag, review_summary['updated_at'])
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', DEFAULT_REVIEWS_PER_PAGE, type=int), 1), MAX_REVIEWS_PER_PAGE)
+    response = make_response(render_reviews_page(keyword, page, per_page, review_summary))
+    return cacheable(response, etag, review_summary['updated_at'])
+
+def render_reviews_page(keyword, page=1, per_page=DEFAULT_REVIEWS_PER_PAGE, review_summary=None):
+    """Renders one page of a post's reviews to HTML (shared by view_reviews and the static export)."""
+    if review_summary is None:
+        review_summary = review_store.summary(keyword)
+    # Newest first, one page at a time; the total comes from the cached per-post count
+    try:
+        total_reviews = review_summary['count']
+        reviews = review_store.list(keyword, limit=per_page, offset=(page - 1) * per_page)
+    except Exception as e:
+        logger.error("Error loading reviews for %s: %s", keyword, e)
+        # Continue without reviews if loading fails
+        total_reviews = 0
+        reviews = []
+    total_pages = max((total_reviews + per_page - 1) // per_page, 1)
 
+    pagination = {'page': page, 'per_page': per_page, 'total_pages': total_pages, 'total_reviews': total_reviews}
     # Pass the keyword to the template for the review submission form
-    return render_template('reviews_only.html', reviews=reviews, keyword=keyword)
+    return render_template('reviews_only.html', reviews=reviews, keyword=keyword, pagination=pagination)
+
+def highlight_snippet(snippet):
+    """Escapes a search snippet and turns the store's match markers into <mark> tags."""
+    return Markup(str(escape(snippet)).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
+
+@app.route('/search')
+def search():
+    """Full-text search over post titles and bodies (?q=...&page=...); ?format=json returns the results as JSON"""
+    query = request.args.get('q', '').strip()
+    as_json = request.args.get('format') == 'json'
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', DEFAULT_SEARCH_RESULTS_PER_PAGE, type=int), 1), MAX_SEARCH_RESULTS_PER_PAGE)
+
+    # Results only change when a post is written or deleted
+    store_version = post_store.version()
+    etag = make_etag('search', query, page, per_page, as_json, store_version['version'], TEMPLATE_FINGERPRINT)
+    if is_not_modified(request, etag, store_version['changed_at']):
+        return cacheable(Response(status=304), etag, store_version['changed_at'])
+
+    found = post_store.search(query, limit=per_page, offset=(page - 1) * per_page)
+    results = []
+    for result in found['results']:
+        title = result['title']
+        if title == "Untitled Post":
+            title = result['keyword'].replace("-", " ").replace("_", " ")
+        results.append({'keyword': result['keyword'], 'title': title,
+                        'snippet': highlight_snippet(result['snippet']), 'score': result['score']})
+    total_pages = max((found['total'] + per_page - 1) // per_page, 1)
+    pagination = {'page': page, 'per_page': per_page, 'total_pages': total_pages, 'total_results': found['total']}
+
+    if as_json:
+        response = jsonify({
+            'query': query,
+            'pagination': pagination,
+            'results': [dict(result, snippet=str(result['snippet']), url=url_for('view_post', filename=result['keyword']))
+                        for result in results],
+        })
+    else:
+        response = make_response(render_template('search.html', query=query, results=results,
+                                                 pagination=pagination))
+    return cacheable(response, etag, store_version['changed_at'])
+
+# Static export of the post, reviews and index pages (see site_export.py)
+site_exporter = SiteExporter(
+    STATIC_EXPORT_DIR, post_store, review_store,
+    render_post=render_post_page, render_reviews=render_reviews_page, render_index=render_home_page,
+    fingerprint=make_etag(RENDER_VERSION, TEMPLATE_FINGERPRINT),
+) if STATIC_EXPORT_DIR else None
+
+def export_static_site(keywords=None):
+    """Re-exports the static pages of the given posts (all posts if None) plus the index; no-op when export is off."""
+    if site_exporter is None:
+        return None
+    try:
+        # Templates need an application/request context for url_for
+        with app.test_request_context('/'):
+            return site_exporter.export(keywords)
+    except Exception as e:
+        logger.error("Error exporting static site: %s", e)
+        return None
+
+# Write paths queue exports to one background thread per process instead of rendering inside the request
+export_queue = ExportQueue(export_static_site) if site_exporter else None
+
+def queue_static_export(keywords=None):
+    """Queues export_static_site(keywords) on the background export thread and returns at once."""
+    if export_queue is not None:
+        export_queue.request(keywords)
+
+def wait_for_static_export(timeout=None):
+    """Blocks until queued exports have run, for short-lived processes such as the batch CLI."""
+    return export_queue.wait(timeout) if export_queue is not None else True
+
+def start_scheduler():
+    """Starts the cron scheduler unless another process on this host already holds the scheduler lock."""
+    global scheduler_lock
+    if scheduler.running:
+        return True
+    lock_file = open(SCHEDULER_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    # Keep the handle open for the life of the process; the OS releases the lock if it dies
+    scheduler_lock = lock_file
 
-if __name__ == '__main__':
-    # Start the scheduler
     scheduler.add_job(generate_daily_post, 'cron', hour=9, minute=15)  # Run at midnight every day
+    scheduler.add_job(generate_batch_posts, 'cron', hour=1, minute=0)  # Nightly batch from BATCH_KEYWORDS_FILE
     scheduler.start()
+    logger.info("Scheduler started in process %s", os.getpid())
+    return True
+
+def start_background_services():
+    """Starts the scheduler (in one process only) and this process's generation job workers."""
+    # Only the process that runs the scheduler brings the whole static export up to date (e.g. after a
+    # template change), in the background so the worker starts serving at once
+    if start_scheduler():
+        queue_static_export()
+    # Resume any generation jobs left queued by a previous run
+    job_queue.start()
+
+scheduler_lock = None
+
+@app.route('/health')
+def health():
+    """Liveness/readiness probe used by Docker and nginx."""
+    try:
+        post_store.count()
+    except Exception as e:
+        return jsonify({"status": "error", "error": str(e)}), 503
+    return jsonify({
+        "status": "ok",
+        "scheduler": scheduler.running,
+        "llm_breaker": llm_provider.breaker.stats()["state"]
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint (merged across gunicorn workers when METRICS_DIR is set)."""
+    return Response(registry.exposition(), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    debug = os.getenv("FLASK_DEBUG", "1") == "1"
+
+    # With the reloader active only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
 
     # Ensure directories exist (already done, but good to be explicit)
     os.makedirs(GENERATED_POSTS_DIR, exist_ok=True)
     os.makedirs(REVIEWS_DIR, exist_ok=True)
 
-    # Run the Flask app
+    # Run the Flask development server
     # Using host='0.0.0.0' makes the server externally visible (useful for testing in some environments)
-    # debug=True should be False in production
-    app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
+    # For production use gunicorn (see gunicorn.conf.py); set FLASK_DEBUG=0 to disable debug mode here
+    app.run(debug=debug, host='0.0.0.0', port=int(os.getenv("PORT", "5000")))
@@ -0,0 +1,181 @@
+"""
+ASGI entry point: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+/generate and /generate/stream are served on the event loop. The LLM call is
+awaited through AsyncOpenAI, and the store, SEO and completion cache steps
+around it run in worker threads. A generation waiting on the model therefore
+holds no thread, and a worker can keep dozens in flight. Every other route is
+the Flask app from app.py, unchanged, run in a small thread pool that page
+views no longer share with generations.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import aclosing
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.wrappers import Response
+
+import app as blog
+from ai_generator import async_provider, generate_blog_post_async, stream_blog_post_async
+from sectioned_generator import generate_sectioned_post_async
+from http_cache import mark_fresh_write
+from llm_provider import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Threads per worker process running the Flask routes (page views, reviews, jobs, search)
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "8"))
+
+
+async def generate_and_store_post_async(keyword, force=False, sectioned=False):
+    """app.generate_and_store_post with the LLM call awaited; the steps around it run in threads."""
+    existing, seo_data = await asyncio.to_thread(blog.start_generation, keyword, force)
+    if existing is not None:
+        return existing
+    with blog.GENERATION_STAGE_SECONDS.time(stage='llm_call'):
+        generate = generate_sectioned_post_async if sectioned else generate_blog_post_async
+        blog_post_content = await generate(keyword, seo_data, force=force)
+    return await asyncio.to_thread(blog.finish_generation, keyword, seo_data, blog_post_content)
+
+
+async def generation_events(keyword, force):
+    """The Server-Sent Events of app.generate_post_stream, with the LLM stream read on the event loop."""
+    try:
+        existing, seo_data = await asyncio.to_thread(blog.start_generation, keyword, force, 'stream')
+        if existing is not None:
+            yield blog.sse_event(existing, event="done")
+            return
+        chunks = []
+        # Includes time the client takes to read the stream, like the LLM call itself does
+        with blog.GENERATION_STAGE_SECONDS.time(stage='llm_call'):
+            async with aclosing(stream_blog_post_async(keyword, seo_data, force=force)) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield blog.sse_event({"delta": chunk})
+        result = await asyncio.to_thread(blog.finish_generation, keyword, seo_data, "".join(chunks))
+        yield blog.sse_event(result, event="done")
+    except Exception as e:
+        logger.error("Error streaming blog post: %s", e)
+        yield blog.sse_event({"error": str(e)}, event="error")
+
+
+def response_start(response):
+    """The http.response.start message for a werkzeug response's status and headers (cookies included)."""
+    return {
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in response.headers.items()],
+    }
+
+
+def json_response(payload, status=200):
+    response = Response(json.dumps(payload), status=status, mimetype='application/json')
+    if status < 400:
+        # Same read-your-writes cookie app.bypass_micro_cache_after_write sets for Flask's write endpoints
+        mark_fresh_write(response, blog.HTTP_MICRO_CACHE_SECONDS)
+    return response
+
+
+async def generate_post(params, receive, send):
+    """Async /generate: same parameters and responses as app.generate_post."""
+    keyword = params.get('keyword')
+    if not keyword:
+        response = json_response({"error": "Keyword is required"}, 400)
+    else:
+        try:
+            response = json_response(await generate_and_store_post_async(
+                keyword, force=blog.is_forced(params), sectioned=blog.is_sectioned(params)))
+        except CircuitOpenError as e:
+            # The LLM endpoint is known to be down: fail fast
+            response = json_response({"error": str(e)}, 503)
+        except Exception as e:
+            logger.error("Error generating blog post: %s", e)
+            response = json_response({"error": str(e)}, 500)
+    await send(response_start(response))
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+    return response.status_code
+
+
+async def generate_post_stream(params, receive, send):
+    """Async /generate/stream: same events as app.generate_post_stream; stops if the client disconnects."""
+    keyword = params.get('keyword')
+    if not keyword:
+        response = json_response({"error": "Keyword is required"}, 400)
+        await send(response_start(response))
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+        return response.status_code
+
+    response = Response(mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Tell nginx not to buffer the stream
+    })
+    mark_fresh_write(response, blog.HTTP_MICRO_CACHE_SECONDS)
+    await send(response_start(response))
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        # Closing the generator on disconnect also closes the upstream LLM stream
+        async with aclosing(generation_events(keyword, blog.is_forced(params))) as events:
+            async for event in events:
+                if disconnected.is_set():
+                    break
+                await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+    return response.status_code
+
+
+class BlogASGI:
+    """Routes the generation endpoints to their async handlers and everything else to the Flask app."""
+
+    routes = {'/generate': generate_post, '/generate/stream': generate_post_stream}
+
+    def __init__(self, wsgi_app, threads=WSGI_THREADS):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        handler = self.routes.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+        if handler is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        # Raw non-ASCII bytes and %-escapes both decode as UTF-8, as Werkzeug does for the Flask routes
+        query = parse_qs(scope['query_string'].decode('utf-8', 'replace'))
+        params = {name: values[0] for name, values in query.items()}
+        status = await handler(params, receive, send)
+        # Same series as the Flask routes' request metrics (app.record_request_metrics)
+        blog.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=scope['path'], method='GET')
+        blog.HTTP_REQUESTS.inc(route=scope['path'], method='GET', status=status)
+
+    async def lifespan(self, receive, send):
+        # Background services are started by gunicorn's post_worker_init hook, as for the WSGI app
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_provider.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = BlogASGI(blog.app)
+application = app
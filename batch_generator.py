@@ -0,0 +1,268 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from llm_provider import CircuitOpenError, FatalLLMError, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Rough size of one generation request, used for tokens-per-minute budgeting:
+# ~3 KB prompt (about 800 tokens) plus the max_tokens completion cap.
+ESTIMATED_TOKENS_PER_POST = 2800
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at ``rate_per_minute``.
+
+    ``acquire(n)`` blocks until ``n`` tokens are available, so callers are
+    paced to the configured budget rather than rejected.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_keywords(path: str) -> List[str]:
+    """
+    Reads keywords from a CSV, JSONL or plain-text file.
+
+    CSV files use the ``keyword`` column if present, otherwise the first
+    column. JSONL lines are objects with a ``keyword`` field (or bare strings).
+    Any other extension is read as one keyword per line. Blank entries and
+    duplicates are dropped, preserving order.
+    """
+    keywords = []
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if extension == ".csv":
+            rows = list(csv.reader(f))
+            if rows and "keyword" in [cell.strip().lower() for cell in rows[0]]:
+                column = [cell.strip().lower() for cell in rows[0]].index("keyword")
+                rows = rows[1:]
+            else:
+                column = 0
+            keywords = [row[column] for row in rows if len(row) > column]
+        elif extension in (".jsonl", ".ndjson"):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                keywords.append(item["keyword"] if isinstance(item, dict) else str(item))
+        else:
+            keywords = [line for line in f]
+
+    seen = set()
+    unique = []
+    for keyword in (k.strip() for k in keywords):
+        if keyword and keyword.lower() not in seen:
+            seen.add(keyword.lower())
+            unique.append(keyword)
+    return unique
+
+
+class Checkpoint:
+    """Append-only JSONL record of keywords already committed, so a crashed batch resumes where it stopped."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.done.add(json.loads(line)["key"])
+
+    def mark(self, keys: List[str]):
+        self.done.update(keys)
+        if not self.path:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for key in keys:
+                f.write(json.dumps({"key": key, "at": time.time()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def run_batch(keywords: List[str],
+              generate: Callable[[str, Dict], str],
+              get_seo_many: Callable[[List[str]], Dict[str, Dict]],
+              commit: Callable[[Dict[str, str], Dict[str, Dict]], None],
+              key_fn: Callable[[str], str] = lambda keyword: keyword,
+              max_concurrency: int = 4,
+              requests_per_minute: Optional[float] = 60,
+              tokens_per_minute: Optional[float] = None,
+              tokens_per_request: int = ESTIMATED_TOKENS_PER_POST,
+              max_retries: int = 1,
+              backoff_base: float = 2.0,
+              backoff_max: float = 60.0,
+              commit_every: int = 20,
+              checkpoint_path: Optional[str] = None,
+              find_duplicate: Optional[Callable[[str], Optional[str]]] = None) -> Dict[str, int]:
+    """
+    Generates posts for many keywords concurrently and commits them in bulk.
+
+    Args:
+        keywords (List[str]): Keywords to generate posts for
+        generate (Callable[[str, Dict], str]): Produces post Markdown from keyword and SEO data
+        get_seo_many (Callable[[List[str]], Dict[str, Dict]]): Fetches SEO data for many keywords at once
+        commit (Callable[[Dict[str, str], Dict[str, Dict]], None]): Persists a batch of {key: markdown}
+            together with {key: seo_data}
+        key_fn (Callable[[str], str]): Maps a keyword to its storage key
+        max_concurrency (int): Maximum generations in flight
+        requests_per_minute (Optional[float]): Request budget (None for unlimited)
+        tokens_per_minute (Optional[float]): Token budget (None for unlimited)
+        tokens_per_request (int): Tokens charged against the budget per request
+        max_retries (int): Retries per keyword after the LLM provider's own retries for 429/5xx/connection
+            errors are exhausted; never for fatal errors or while the circuit breaker is open
+        backoff_base (float): Base delay in seconds for exponential backoff
+        backoff_max (float): Cap on a single backoff delay
+        commit_every (int): Number of finished posts buffered before a bulk commit
+        checkpoint_path (Optional[str]): JSONL file of committed keys, used to resume
+        find_duplicate (Optional[Callable[[str], Optional[str]]]): Returns the key of an existing post
+            (or earlier keyword) covering a keyword's topic, or None; such keywords are not generated.
+            Called once per pending keyword, in order, before any model call
+
+    Returns:
+        Dict[str, int]: Counts of generated, skipped (already committed), duplicate and failed keywords
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    request_bucket = TokenBucket(requests_per_minute, capacity=max(1, max_concurrency)) if requests_per_minute else None
+    token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    pending = []
+    skipped = 0
+    duplicates = 0
+    for keyword in keywords:
+        if key_fn(keyword) in checkpoint.done:
+            skipped += 1
+            continue
+        existing = find_duplicate(keyword) if find_duplicate else None
+        if existing is not None:
+            duplicates += 1
+            logger.info(f"Skipping '{keyword}': '{existing}' covers the same topic")
+            continue
+        pending.append(keyword)
+    if skipped:
+        logger.info(f"Resuming batch: {skipped} keywords already committed, {len(pending)} remaining")
+
+    # SEO data for the whole batch is fetched up front in a few bulk requests
+    seo_by_keyword = get_seo_many(pending) if pending else {}
+
+    def generate_one(keyword: str) -> str:
+        attempt = 0
+        while True:
+            if request_bucket:
+                request_bucket.acquire()
+            if token_bucket:
+                token_bucket.acquire(tokens_per_request)
+            try:
+                return generate(keyword, seo_by_keyword[keyword])
+            except Exception as e:
+                # An open breaker is meant to fail fast, and fatal errors would fail the same way again
+                if attempt >= max_retries or isinstance(e, (CircuitOpenError, FatalLLMError)) or not is_retryable(e):
+                    raise
+                # Full jitter: spreads retries out so workers don't stampede the API together
+                delay = random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+                attempt += 1
+                logger.warning(f"Retrying '{keyword}' in {delay:.1f}s (attempt {attempt}/{max_retries}): {str(e)}")
+                time.sleep(delay)
+
+    buffer: Dict[str, str] = {}
+    buffer_seo: Dict[str, Dict] = {}
+    generated = 0
+    failed = 0
+
+    def flush():
+        if buffer:
+            commit(dict(buffer), dict(buffer_seo))
+            checkpoint.mark(list(buffer))
+            buffer.clear()
+            buffer_seo.clear()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(generate_one, keyword): keyword for keyword in pending}
+        for future in as_completed(futures):
+            keyword = futures[future]
+            try:
+                buffer[key_fn(keyword)] = future.result()
+                buffer_seo[key_fn(keyword)] = seo_by_keyword[keyword]
+                generated += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to generate post for '{keyword}': {str(e)}")
+                continue
+            if len(buffer) >= commit_every:
+                flush()
+    flush()
+
+    logger.info(f"Batch finished: {generated} generated, {skipped} skipped, {duplicates} duplicates, {failed} failed")
+    return {"generated": generated, "skipped": skipped, "duplicates": duplicates, "failed": failed}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point: python batch_generator.py keywords.csv [options]"""
+    parser = argparse.ArgumentParser(description="Generate blog posts for a list of keywords.")
+    parser.add_argument("keywords_file", help="CSV (keyword column), JSONL ({\"keyword\": ...}) or one keyword per line")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")))
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "60")),
+                        help="Requests-per-minute budget (0 for unlimited)")
+    parser.add_argument("--tpm", type=float, default=float(os.getenv("BATCH_TOKENS_PER_MINUTE", "0")),
+                        help="Tokens-per-minute budget (0 for unlimited)")
+    parser.add_argument("--max-retries", type=int, default=1,
+                        help="Retries per keyword on top of the LLM provider's own retries")
+    parser.add_argument("--commit-every", type=int, default=20)
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <keywords_file>.checkpoint.jsonl)")
+    parser.add_argument("--force", action="store_true",
+                        help="Generate every keyword, even when a post on the same topic exists")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    # The Flask app module owns the configured post store and static export queue
+    import app as blog_app
+
+    summary = blog_app.run_batch_generation(
+        load_keywords(args.keywords_file),
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm or None,
+        tokens_per_minute=args.tpm or None,
+        max_retries=args.max_retries,
+        commit_every=args.commit_every,
+        checkpoint_path=args.checkpoint or f"{args.keywords_file}.checkpoint.jsonl",
+        force=args.force,
+    )
+    # Committed posts queue their static export on a background thread; let it finish before exiting
+    blog_app.wait_for_static_export()
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+"""
+Page views while slow generations are in flight: gthread workers (wsgi:app)
+against uvicorn workers (asgi:app).
+
+For each server mode the script starts gunicorn with the same number of
+worker processes against a throwaway data directory seeded with synthetic
+posts and a local fake OpenAI-compatible server that takes ``--llm-latency``
+seconds (10 by default) per completion. It then:
+
+1. fires ``--generations`` concurrent ``/generate`` requests (distinct
+   keywords, ``force=true`` so none is served from a cache);
+2. once they are in flight, loads ``/`` and ``/post/<keyword>`` from
+   ``--clients`` processes for ``--duration`` seconds;
+3. waits for every generation to finish.
+
+It reports page-view throughput and latency during that window, plus how
+many generations succeeded and how long they took, as JSON.
+
+    python benchmarks/concurrency_benchmark.py --workers 2 --generations 40 --clients 16
+"""
+import argparse
+import http.client
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from hot_paths import start_fake_llm
+from serving_benchmark import free_port, run_load, seed_posts, start_server, stop_server
+
+# Time for the generation requests to reach the server before page views start
+GENERATION_HEAD_START = 1.0
+
+
+def generate(port, keyword, timeout, results):
+    """One blocking /generate call; appends (seconds, status or None) to ``results``."""
+    start = time.perf_counter()
+    status = None
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+        conn.request("GET", f"/generate?keyword={quote(keyword)}&force=true")
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+        conn.close()
+    except (OSError, http.client.HTTPException):
+        pass
+    results.append((time.perf_counter() - start, status))
+
+
+def summarize_generations(results, count):
+    seconds = sorted(elapsed for elapsed, status in results if status == 200)
+
+    def percentile(p):
+        return round(seconds[min(len(seconds) - 1, int(len(seconds) * p))], 2) if seconds else None
+
+    return {
+        "requested": count,
+        "succeeded": len(seconds),
+        "failed": count - len(seconds),
+        "p50_s": percentile(0.50),
+        "max_s": round(seconds[-1], 2) if seconds else None,
+    }
+
+
+def run_mode(mode, args, llm_port):
+    data_dir = tempfile.mkdtemp(prefix=f"bench-concurrency-{mode}-")
+    try:
+        keywords = seed_posts(data_dir, args.posts)
+        port = free_port()
+        process = start_server(mode, port, data_dir, args.workers, {
+            "LLM_ENDPOINT": f"http://127.0.0.1:{llm_port}/v1",
+            "LLM_READ_TIMEOUT": str(args.llm_latency * 3),
+            "GUNICORN_TIMEOUT": str(int(args.llm_latency * args.generations) + 60),
+        })
+        try:
+            sample = random.Random(0).sample(keywords, min(50, len(keywords)))
+            paths = ["/"] + [f"/post/{keyword}" for keyword in sample]
+            # Warm up caches so page views are measured in steady state
+            run_load(port, paths, 2, 1.0)
+
+            results = []
+            # Generously above the worst case: every generation queued behind every other one
+            timeout = args.llm_latency * args.generations + 60
+            threads = [threading.Thread(target=generate, args=(port, f"concurrency {mode} {i}", timeout, results))
+                       for i in range(args.generations)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(GENERATION_HEAD_START)
+            page_views = run_load(port, paths, args.clients, args.duration)
+            for thread in threads:
+                thread.join()
+            return {
+                "page_views_during_generations": page_views,
+                "generations": summarize_generations(results, args.generations),
+                "all_generations_done_s": round(time.perf_counter() - started, 2),
+            }
+        finally:
+            stop_server(process)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes in both modes")
+    parser.add_argument("--generations", type=int, default=40, help="Concurrent /generate requests")
+    parser.add_argument("--clients", type=int, default=16, help="Page-view client processes")
+    parser.add_argument("--duration", type=float, default=8.0, help="Seconds of page views while generations run")
+    parser.add_argument("--llm-latency", type=float, default=10.0, help="Seconds the fake LLM takes per completion")
+    parser.add_argument("--modes", default="gunicorn,asgi", help="Comma-separated: gunicorn (gthread), asgi (uvicorn)")
+    args = parser.parse_args()
+
+    llm = start_fake_llm(args.llm_latency)
+    results = {"posts": args.posts, "workers": args.workers, "generations": args.generations,
+               "clients": args.clients, "duration_s": args.duration, "llm_latency_s": args.llm_latency,
+               "servers": {}}
+    try:
+        for mode in args.modes.split(","):
+            results["servers"][mode] = run_mode(mode, args, llm.server_address[1])
+    finally:
+        llm.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Reproducible micro-benchmarks for the request and generation hot paths.
+
+For every corpus size a fresh data directory is seeded with deterministic
+synthetic posts (with a "### 6. Sources" section, like generated ones) and
+the app is imported in a child process pointed at it. The script then times:
+
+- storage: bulk save (``put_many``, which also renders each post), loading
+  every post through ``load_blog_posts()``, single-post reads and saves
+- ``parse_post`` (which also supplies stored titles) and ``render_post_content``
+  (parse plus Markdown) on the raw corpus
+- the home listing (first and middle page) and ``/post/<keyword>`` with and
+  without a stored rendering
+- ``/search`` for a rare term (one post's number), a single common word and
+  three common words (every synthetic post matches the last two)
+- the near-duplicate check run before each generation, for stored keywords
+  and for new ones
+- review appends and the post/reviews pages of posts holding 0 to N reviews
+- end-to-end generation (``/generate`` and ``/generate/stream``) against a
+  local fake OpenAI-compatible server with configurable latency
+- the footprint of a fresh worker process: database file size, resident
+  memory after import and after viewing ``--footprint-views`` distinct posts,
+  and the latency of those first views
+
+Everything runs offline. Results are printed (or written with ``--output``) as
+JSON, together with the Python and platform versions, so runs can be
+compared over time.
+
+    python benchmarks/hot_paths.py --posts 100,1000,10000 --reviews 0,100,10000
+    python benchmarks/hot_paths.py --posts 50000 --repeat 50 --output bench-50k.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ("wireless audio battery signal codec latency comfort noise cancelling bluetooth driver "
+         "frequency range charging case fit microphone firmware pairing sound quality review").split()
+SEED_BATCH = 1000
+STREAM_CHUNK_WORDS = 20
+
+
+def synthetic_post(rng, index):
+    """A post shaped like the generator's output: H1, sections, bullet lists and a sources section."""
+
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+
+    parts = [f"# Synthetic Post {index}: {rng.choice(WORDS).title()} Explained"]
+    for section in range(rng.randint(4, 7)):
+        parts.append(f"## Section {section}")
+        parts.append(" ".join(sentence() for _ in range(rng.randint(4, 8))))
+        parts.append("\n".join(f"- **{rng.choice(WORDS)}**: {sentence()}" for _ in range(3)))
+    parts.append("### 6. Sources")
+    parts.append("\n".join(f"- **Source {n}**: {sentence()} (https://example.com/{index}/{n})" for n in range(4)))
+    parts.append("## Closing\n\n" + sentence())
+    return "\n\n".join(parts) + "\n"
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    samples = sorted(samples)
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+
+    return {
+        "runs": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def measure(fn, args_list):
+    """Calls ``fn(*args)`` for every entry of ``args_list`` and summarizes the durations."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions (plain and streamed) with a fixed latency."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without TCP_NODELAY keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+    latency = 0.0
+    content = "# Fake Post\n\n" + "Generated text for benchmarking. " * 200
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({"object": "list", "data": []})
+
+    def completion(self, request):
+        """The (content, seconds) to answer a chat completion request with; subclasses vary them per prompt."""
+        return self.content, self.latency
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content, latency = self.completion(request)
+        usage = {"prompt_tokens": 600, "completion_tokens": 900, "total_tokens": 1500}
+        if not request.get("stream"):
+            time.sleep(latency)
+            self._send_json({"id": "bench", "object": "chat.completion", "created": 0, "model": request["model"],
+                             "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                          "finish_reason": "stop"}],
+                             "usage": usage})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        # Chunks of ~20 words, paced so the whole stream takes ``latency``
+        words = content.split(" ")
+        pieces = [" ".join(words[i:i + STREAM_CHUNK_WORDS]) + " " for i in range(0, len(words), STREAM_CHUNK_WORDS)]
+        delay = latency / len(pieces)
+        for piece in pieces:
+            time.sleep(delay)
+            chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": request["model"],
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if request.get("stream_options", {}).get("include_usage"):
+            chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": request["model"],
+                     "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_fake_llm(latency, handler=FakeLLMHandler):
+    handler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_posts(store, count, seed):
+    """Writes ``count`` synthetic posts in batches; returns the keywords and the bulk save timing."""
+    rng = random.Random(seed)
+    keywords = []
+    began = time.perf_counter()
+    for first in range(0, count, SEED_BATCH):
+        batch = {f"synthetic-post-{i}": synthetic_post(rng, i) for i in range(first, min(first + SEED_BATCH, count))}
+        store.put_many(batch)
+        keywords.extend(batch)
+    elapsed = time.perf_counter() - began
+    return keywords, {"posts": count, "seconds": round(elapsed, 3), "posts_per_second": round(count / elapsed, 1)}
+
+
+def resident_kb(field="VmRSS"):
+    """
+    Resident memory of this process in KiB, from /proc (peak RSS where /proc is unavailable).
+
+    ``RssAnon`` is the part only this process can hold: memory-mapped database
+    pages count towards VmRSS too, but are shared page cache the kernel can drop.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def configure_app_env(data_dir, llm_port):
+    """Points the app (imported afterwards) at ``data_dir`` and a local LLM port."""
+    os.chdir(data_dir)  # the app migrates legacy JSON files from the working directory
+    os.environ.update({
+        "BLOG_POSTS_STORE": os.path.join(data_dir, "blog_posts.db"),
+        "REVIEWS_STORE": os.path.join(data_dir, "reviews.db"),
+        "JOBS_DB": os.path.join(data_dir, "jobs.db"),
+        "COMPLETION_CACHE_DB": os.path.join(data_dir, "completion_cache.db"),
+        "SCHEDULER_LOCK_FILE": os.path.join(data_dir, "scheduler.lock"),
+        "LLM_ENDPOINT": f"http://127.0.0.1:{llm_port}/v1",
+        "OPENAI_API_KEY": "benchmark",
+        "LOG_LEVEL": "WARNING",
+    })
+    os.environ.pop("STATIC_EXPORT_DIR", None)
+    os.environ.pop("METRICS_DIR", None)
+    sys.path.insert(0, REPO_ROOT)
+
+
+def run_corpus(data_dir, posts, review_counts, repeat, llm_latency, generations, seed):
+    """Runs every benchmark against one corpus; executed in a fresh process so the app binds to ``data_dir``."""
+    server = start_fake_llm(llm_latency)
+    configure_app_env(data_dir, server.server_port)
+    import app as blog_app
+
+    rng = random.Random(seed)
+    client = blog_app.app.test_client()
+    results = {"posts": posts}
+
+    keywords, results["storage_bulk_save"] = seed_posts(blog_app.post_store, posts, seed)
+    sample = [rng.choice(keywords) for _ in range(repeat)]
+    bodies = [blog_app.post_store.get(keyword) for keyword in sample]
+
+    # Storage
+    load_runs = max(1, min(repeat, 5_000_000 // (posts * 100)))
+    results["storage_load_all"] = measure(lambda: sum(1 for _ in blog_app.load_blog_posts().values()),
+                                          [()] * load_runs)
+    results["storage_get"] = measure(blog_app.post_store.get, [(keyword,) for keyword in sample])
+    results["storage_put"] = measure(blog_app.post_store.put, list(zip(sample, bodies)))
+
+    # Parsing and rendering of the raw Markdown
+    results["parse_post"] = measure(blog_app.parse_post, [(body,) for body in bodies])
+    results["render_post_content"] = measure(blog_app.render_post_content, [(body,) for body in bodies])
+
+    # Pages through the full Flask stack (no conditional headers, so every request renders)
+    middle_page = max(posts // blog_app.DEFAULT_POSTS_PER_PAGE // 2, 1)
+    results["home_first_page"] = measure(client.get, [("/",)] * repeat)
+    results["home_middle_page"] = measure(client.get, [(f"/?page={middle_page}",)] * repeat)
+
+    def cold_post(path):
+        blog_app.post_store.clear_rendered()
+        client.get(path)
+
+    paths = [(f"/post/{keyword}",) for keyword in sample]
+    results["view_post_cold"] = measure(cold_post, paths)
+    for path in set(paths):
+        client.get(*path)
+    results["view_post_warm"] = measure(client.get, paths)
+
+    # Full-text search: a term in one post, then queries matching (nearly) the whole corpus
+    search_rng = random.Random(seed + 2)
+    results["search_rare"] = measure(
+        client.get, [(f"/search?q=synthetic+{search_rng.randrange(posts)}",) for _ in range(repeat)])
+    results["search_common"] = measure(
+        client.get, [(f"/search?q={search_rng.choice(WORDS)}",) for _ in range(repeat)])
+    results["search_broad"] = measure(
+        client.get, [("/search?q=" + "+".join(search_rng.sample(WORDS, 3)),) for _ in range(repeat)])
+
+    # Near-duplicate check that precedes every unforced generation
+    results["duplicate_check_hit"] = measure(
+        blog_app.find_existing_post, [(keyword.replace("-", " "),) for keyword in sample])
+    results["duplicate_check_miss"] = measure(
+        blog_app.find_existing_post, [(" ".join(search_rng.sample(WORDS, 3)),) for _ in range(repeat)])
+
+    # Reviews: one post per requested review count
+    results["reviews"] = {}
+    review_rng = random.Random(seed + 1)
+    for count, keyword in zip(review_counts, review_rng.sample(keywords, min(len(review_counts), len(keywords)))):
+        blog_app.review_store.add_many(keyword, [
+            {"name": f"reader-{i}", "review": f"Synthetic review {i}. " * 5, "timestamp": "2024-01-01 00:00:00"}
+            for i in range(count)
+        ])
+        review = {"name": "bench", "review": "Appended review", "timestamp": "2024-01-01 00:00:00"}
+        results["reviews"][str(count)] = {
+            "view_post": measure(client.get, [(f"/post/{keyword}",)] * repeat),
+            "view_reviews": measure(client.get, [(f"/reviews/{keyword}",)] * repeat),
+            "append": measure(blog_app.review_store.add, [(keyword, review)] * repeat),
+        }
+
+    # End-to-end generation (forced past the completion cache, so every run calls the fake LLM)
+    def generate(path):
+        response = client.get(path)
+        response.get_data()
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+
+    results["generate"] = measure(generate, [(f"/generate?keyword=bench+{i}&force=1",) for i in range(generations)])
+    results["generate_stream"] = measure(
+        generate, [(f"/generate/stream?keyword=bench+stream+{i}&force=1",) for i in range(generations)])
+
+    server.shutdown()
+    return results
+
+
+def worker_footprint(data_dir, posts, views, seed):
+    """Memory and first-view latency of a fresh worker process over an existing corpus."""
+    configure_app_env(data_dir, 9)  # never called: nothing is generated here
+    import app as blog_app
+
+    conn = blog_app.post_store._connect()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db_bytes = sum(os.path.getsize(path) for path in
+                   (blog_app.BLOG_POSTS_STORE, f"{blog_app.BLOG_POSTS_STORE}-wal") if os.path.exists(path))
+    client = blog_app.app.test_client()
+    rss_after_import = resident_kb()
+    rng = random.Random(seed + 3)
+    paths = [(f"/post/synthetic-post-{index}",) for index in rng.sample(range(posts), min(views, posts))]
+    view = measure(client.get, paths)
+    return {
+        "db_bytes": db_bytes,
+        "rss_after_import_kb": rss_after_import,
+        "rss_after_views_kb": resident_kb(),
+        "rss_anon_after_views_kb": resident_kb("RssAnon"),
+        "views": view,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", default="100,1000", help="Comma-separated corpus sizes (e.g. 100,1000,10000,50000)")
+    parser.add_argument("--reviews", default="0,100,1000", help="Comma-separated review counts per benchmarked post")
+    parser.add_argument("--repeat", type=int, default=200, help="Samples per measurement")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake LLM takes per completion")
+    parser.add_argument("--generations", type=int, default=10, help="End-to-end generations per mode")
+    parser.add_argument("--footprint-views", type=int, default=2000,
+                        help="Distinct posts viewed by the fresh worker in the footprint measurement")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    results = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {"repeat": args.repeat, "llm_latency_s": args.llm_latency, "generations": args.generations,
+                     "footprint_views": args.footprint_views, "seed": args.seed},
+        "corpora": [],
+    }
+    review_counts = [int(count) for count in args.reviews.split(",")]
+    # A fresh interpreter per corpus: the app binds its stores at import time
+    context = multiprocessing.get_context("spawn")
+    for posts in (int(count) for count in args.posts.split(",")):
+        data_dir = tempfile.mkdtemp(prefix=f"bench-hot-{posts}-")
+        try:
+            with context.Pool(1) as pool:
+                corpus = pool.apply(run_corpus, (data_dir, posts, review_counts, args.repeat,
+                                                 args.llm_latency, args.generations, args.seed))
+            with context.Pool(1) as pool:
+                corpus["worker_footprint"] = pool.apply(worker_footprint, (data_dir, posts, args.footprint_views,
+                                                                           args.seed))
+            results["corpora"].append(corpus)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
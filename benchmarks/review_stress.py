@@ -0,0 +1,126 @@
+"""
+Multi-process stress test for the review store.
+
+Several processes append reviews to a handful of posts at the same time, then
+the script checks that every review was stored exactly once and that the
+cached per-post counts match the stored rows. The same workload is run
+against the legacy read-modify-write JSON files for comparison, which lose
+reviews under contention. Results are printed as JSON; the exit status is
+non-zero if the review store lost or duplicated anything.
+
+    python benchmarks/review_stress.py --processes 8 --reviews 500 --posts 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from review_store import ReviewStore  # noqa: E402
+
+
+def make_review(worker, index):
+    return {"name": f"worker-{worker}", "review": f"review {index}", "timestamp": "2024-01-01 00:00:00"}
+
+
+def store_worker(db_path, worker, reviews, posts, start):
+    store = ReviewStore(db_path)
+    start.wait()
+    for index in range(reviews):
+        store.add(f"post-{index % posts}", make_review(worker, index))
+    store.close()
+
+
+def legacy_worker(reviews_dir, worker, reviews, posts, start):
+    # The pre-review-store submit_review: load the whole file, append, rewrite it
+    start.wait()
+    for index in range(reviews):
+        path = os.path.join(reviews_dir, f"post-{index % posts}_reviews.json")
+        existing = []
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+            except Exception:
+                existing = []
+        existing.append(make_review(worker, index))
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(existing, f, indent=4)
+        except Exception:
+            pass
+
+
+def run(target, location, processes, reviews, posts):
+    start = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=target, args=(location, i, reviews, posts, start))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    began = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--reviews", type=int, default=500, help="Reviews appended by each process")
+    parser.add_argument("--posts", type=int, default=4, help="Posts the reviews are spread over")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only exercise the review store")
+    args = parser.parse_args()
+
+    expected = args.processes * args.reviews
+    results = {"processes": args.processes, "expected_reviews": expected}
+    work_dir = tempfile.mkdtemp(prefix="review-stress-")
+    try:
+        db_path = os.path.join(work_dir, "reviews.db")
+        ReviewStore(db_path).close()
+        elapsed = run(store_worker, db_path, args.processes, args.reviews, args.posts)
+        store = ReviewStore(db_path)
+        stored = sum(len(store.list(f"post-{p}")) for p in range(args.posts))
+        counted = sum(store.count(f"post-{p}") for p in range(args.posts))
+        unique = len({(r["name"], r["review"]) for p in range(args.posts) for r in store.list(f"post-{p}")})
+        results["review_store"] = {
+            "stored": stored,
+            "cached_count": counted,
+            "unique": unique,
+            "lost": expected - unique,
+            "appends_per_second": round(expected / elapsed, 1),
+        }
+
+        if not args.skip_legacy:
+            legacy_dir = os.path.join(work_dir, "reviews")
+            os.makedirs(legacy_dir)
+            elapsed = run(legacy_worker, legacy_dir, args.processes, args.reviews, args.posts)
+            stored = 0
+            for p in range(args.posts):
+                try:
+                    with open(os.path.join(legacy_dir, f"post-{p}_reviews.json"), "r", encoding="utf-8") as f:
+                        stored += len(json.load(f))
+                except Exception:
+                    pass
+            results["legacy_json"] = {
+                "stored": stored,
+                "lost": expected - stored,
+                "appends_per_second": round(expected / elapsed, 1),
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+    review_store = results["review_store"]
+    ok = review_store["stored"] == review_store["cached_count"] == review_store["unique"] == expected
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
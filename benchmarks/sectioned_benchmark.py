@@ -0,0 +1,164 @@
+"""
+Single-shot against sectioned generation (sectioned_generator.py), end to end
+through /generate.
+
+Starts each server mode against a throwaway data directory and a local fake
+OpenAI-compatible server whose completion time grows with the length it is
+asked for: ``--first-token`` seconds plus ``--seconds-per-word`` per word
+written, like a model decoding at a fixed rate. A single-shot post is the
+prompt's 900 words in one call. A sectioned post is a short outline followed
+by its sections (about 150-220 words each) in parallel. ``--failure-rate``
+makes that fraction of completions answer 500, to exercise the retries.
+
+For each mode it runs ``--generations`` sequential ``/generate`` requests of
+each kind (``force=true``, so nothing comes from a cache) and reports their
+wall-clock times, word counts and section counts as JSON.
+
+    python benchmarks/sectioned_benchmark.py --generations 3 --seconds-per-word 0.012
+"""
+import argparse
+import http.client
+import json
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from hot_paths import FakeLLMHandler, start_fake_llm
+from serving_benchmark import free_port, seed_posts, start_server, stop_server
+
+# Word counts the prompts ask for: "about 220 words" (a section) or "Target 700-900 words" (a whole post)
+_ABOUT_WORDS = re.compile(r"about (\d+) words")
+_TARGET_WORDS = re.compile(r"Target \d+-(\d+) words")
+FAKE_OUTLINE = json.dumps({"title": "Fake Post", "sections": [
+    {"kind": "introduction", "heading": "", "points": ["what it is", "why it matters"]},
+    {"kind": "main", "heading": "How It Works", "points": ["the basics", "an analogy"]},
+    {"kind": "main", "heading": "Practical Examples", "points": ["everyday uses", "a step-by-step example"]},
+    {"kind": "main", "heading": "Common Misconceptions", "points": ["myths", "benefits and challenges"]},
+    {"kind": "future", "heading": "The Future of Fake Posts", "points": ["trends", "what to watch"]},
+    {"kind": "conclusion", "heading": "Key Takeaways and Next Steps", "points": ["summary", "next steps"]},
+    {"kind": "sources", "heading": "Sources", "points": []},
+]})
+
+
+class PacedLLMHandler(FakeLLMHandler):
+    """Fake LLM whose latency is first-token time plus a per-word decode time; optionally fails some calls."""
+
+    seconds_per_word = 0.0
+    failure_rate = 0.0
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def completion(self, request):
+        prompt = request["messages"][-1]["content"]
+        if '"sections"' in prompt:
+            content = FAKE_OUTLINE
+        else:
+            about, target = _ABOUT_WORDS.search(prompt), _TARGET_WORDS.search(prompt)
+            words = int((about or target).group(1)) if about or target else 900
+            sentence = "Generated text for benchmarking. "
+            content = ("# Fake Post\n\n" if target else "") + sentence * (words // len(sentence.split()))
+        return content, self.latency + len(content.split()) * self.seconds_per_word
+
+    def do_POST(self):
+        with self.lock:
+            failed = self.rng.random() < self.failure_rate
+        if not failed:
+            try:
+                super().do_POST()
+            except BrokenPipeError:
+                pass  # A call abandoned when its generation's time budget ran out
+            return
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"error": {"message": "injected failure", "type": "server_error"}}).encode()
+        self.send_response(500)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def generate(port, keyword, sectioned, timeout):
+    """One /generate call; returns (seconds, status, post Markdown or error message)."""
+    query = f"keyword={quote(keyword)}&force=true&sectioned={'true' if sectioned else 'false'}"
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", f"/generate?{query}")
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    return elapsed, response.status, payload.get("blog_post") or payload.get("error")
+
+
+def summarize(runs):
+    seconds = sorted(elapsed for elapsed, status, _ in runs if status == 200)
+    posts = [post for _, status, post in runs if status == 200]
+    return {
+        "succeeded": len(seconds),
+        "failed": len(runs) - len(seconds),
+        "errors": sorted({post for _, status, post in runs if status != 200}),
+        "median_s": round(seconds[len(seconds) // 2], 2) if seconds else None,
+        "max_s": round(seconds[-1], 2) if seconds else None,
+        "words": round(sum(len(post.split()) for post in posts) / len(posts)) if posts else None,
+        "sections": round(sum(post.count("\n## ") for post in posts) / len(posts), 1) if posts else None,
+    }
+
+
+def run_mode(mode, args, llm_port):
+    data_dir = tempfile.mkdtemp(prefix=f"bench-sectioned-{mode}-")
+    try:
+        seed_posts(data_dir, 10)
+        port = free_port()
+        process = start_server(mode, port, data_dir, 1, {
+            "LLM_ENDPOINT": f"http://127.0.0.1:{llm_port}/v1",
+            "SECTIONED_TIME_BUDGET_SECONDS": str(args.time_budget),
+            "GUNICORN_TIMEOUT": "600",
+        })
+        try:
+            timeout = args.time_budget * 3 + 60
+            results = {}
+            for sectioned in (False, True):
+                kind = "sectioned" if sectioned else "single_shot"
+                results[kind] = summarize([generate(port, f"sectioned {mode} {kind} {i}", sectioned, timeout)
+                                           for i in range(args.generations)])
+            return results
+        finally:
+            stop_server(process)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generations", type=int, default=3, help="Sequential /generate requests of each kind")
+    parser.add_argument("--first-token", type=float, default=0.5, help="Fake LLM seconds before the first word")
+    parser.add_argument("--seconds-per-word", type=float, default=0.012,
+                        help="Fake LLM decode time per word (0.012 is roughly 100 tokens/s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of completions answering 500")
+    parser.add_argument("--time-budget", type=float, default=120.0, help="SECTIONED_TIME_BUDGET_SECONDS")
+    parser.add_argument("--modes", default="gunicorn,asgi", help="Comma-separated: gunicorn (gthread), asgi (uvicorn)")
+    args = parser.parse_args()
+
+    PacedLLMHandler.seconds_per_word = args.seconds_per_word
+    PacedLLMHandler.failure_rate = args.failure_rate
+    llm = start_fake_llm(args.first_token, PacedLLMHandler)
+    results = {"generations": args.generations, "first_token_s": args.first_token,
+               "seconds_per_word": args.seconds_per_word, "failure_rate": args.failure_rate,
+               "time_budget_s": args.time_budget, "servers": {}}
+    try:
+        for mode in args.modes.split(","):
+            results["servers"][mode] = run_mode(mode, args, llm.server_address[1])
+    finally:
+        llm.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
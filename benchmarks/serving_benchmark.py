@@ -0,0 +1,181 @@
+"""
+Load test comparing the Flask development server with the gunicorn production setup
+(``gunicorn``: gthread workers running wsgi:app; ``asgi``: uvicorn workers running asgi:app).
+
+Starts each server against a throwaway data directory seeded with synthetic
+posts, then hammers ``/`` and ``/post/<keyword>`` from several client
+processes over keep-alive connections and reports requests/second and latency
+percentiles as JSON.
+
+    python benchmarks/serving_benchmark.py --posts 500 --clients 16 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_posts(data_dir, count):
+    """Writes ``count`` synthetic posts into a fresh post store and returns their keywords."""
+    sys.path.insert(0, REPO_ROOT)
+    from post_store import PostStore
+
+    body = "\n\n".join(
+        f"## Section {i}\n\n" + "Wireless audio is a broad topic with many details. " * 20 for i in range(6)
+    )
+    posts = {f"keyword-{i}": f"# Synthetic Post {i}\n\n{body}" for i in range(count)}
+    store = PostStore(os.path.join(data_dir, "blog_posts.db"))
+    store.put_many(posts)
+    store.close()
+    return list(posts)
+
+
+def start_server(mode, port, data_dir, workers, extra_env=None):
+    env = dict(os.environ)
+    env.update({
+        "BLOG_POSTS_STORE": os.path.join(data_dir, "blog_posts.db"),
+        "JOBS_DB": os.path.join(data_dir, "jobs.db"),
+        "COMPLETION_CACHE_DB": os.path.join(data_dir, "completion_cache.db"),
+        "SCHEDULER_LOCK_FILE": os.path.join(data_dir, "scheduler.lock"),
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "benchmark"),
+        "PORT": str(port),
+    })
+    env.update(extra_env or {})
+    if mode == "dev":
+        env["FLASK_DEBUG"] = "0"
+        cmd = [sys.executable, "app.py"]
+    else:
+        env["GUNICORN_BIND"] = f"127.0.0.1:{port}"
+        env["GUNICORN_LOG_LEVEL"] = "warning"
+        if workers:
+            env["WEB_CONCURRENCY"] = str(workers)
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null"]
+        cmd += ["-k", "uvicorn_worker.UvicornWorker", "asgi:app"] if mode == "asgi" else ["wsgi:app"]
+    process = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{mode} server did not become healthy on port {port}")
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=15)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def client_worker(port, paths, duration, seed, queue):
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    queue.put((latencies, errors))
+
+
+def run_load(port, paths, clients, duration):
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=client_worker, args=(port, paths, duration, i, queue))
+                 for i in range(clients)]
+    for process in processes:
+        process.start()
+    latencies, errors = [], 0
+    for _ in processes:
+        worker_latencies, worker_errors = queue.get()
+        latencies.extend(worker_latencies)
+        errors += worker_errors
+    for process in processes:
+        process.join()
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=0, help="gunicorn workers (default: gunicorn.conf.py sizing)")
+    parser.add_argument("--modes", default="dev,gunicorn", help="Comma-separated: dev, gunicorn, asgi")
+    args = parser.parse_args()
+
+    results = {"posts": args.posts, "clients": args.clients, "duration_s": args.duration, "servers": {}}
+    for mode in args.modes.split(","):
+        data_dir = tempfile.mkdtemp(prefix=f"bench-{mode}-")
+        try:
+            keywords = seed_posts(data_dir, args.posts)
+            port = free_port()
+            process = start_server(mode, port, data_dir, args.workers)
+            try:
+                sample = random.Random(0).sample(keywords, min(50, len(keywords)))
+                routes = {"/": ["/"], "/post/<keyword>": [f"/post/{keyword}" for keyword in sample]}
+                # Warm up caches so both servers are measured in steady state
+                run_load(port, routes["/"] + routes["/post/<keyword>"], 2, 1.0)
+                results["servers"][mode] = {route: run_load(port, paths, args.clients, args.duration)
+                                            for route, paths in routes.items()}
+            finally:
+                stop_server(process)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
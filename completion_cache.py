@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def completion_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """Content address of a completion request: SHA-256 over the model, messages and sampling parameters."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Disk-backed cache of chat completions keyed by ``completion_key``.
+
+    Entries expire after ``ttl_seconds``. The store is a SQLite file, so it is
+    shared safely by all workers and processes on the host; once the total
+    size of cached completions exceeds ``max_bytes`` the least recently used
+    entries are removed.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS completions (
+                   key TEXT PRIMARY KEY,
+                   created_at REAL NOT NULL,
+                   accessed_at REAL NOT NULL,
+                   size INTEGER NOT NULL,
+                   content TEXT NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached completion text, or None on a miss or expired entry."""
+        conn = self._connect()
+        row = conn.execute("SELECT created_at, content FROM completions WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[0] > self.ttl_seconds:
+            if row is not None:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            self._count(False)
+            return None
+        conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return row[1]
+
+    def put(self, key: str, content: str):
+        """Stores a completion and evicts least recently used entries beyond the size bound."""
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                         (key, now, now, size, content))
+            conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims = []
+                for victim_key, victim_size in conn.execute(
+                        "SELECT key, size FROM completions WHERE key != ? ORDER BY accessed_at", (key,)):
+                    if excess <= 0:
+                        break
+                    victims.append((victim_key,))
+                    excess -= victim_size
+                conn.executemany("DELETE FROM completions WHERE key = ?", victims)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connect().execute("DELETE FROM completions")
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        with self._lock:
+            return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
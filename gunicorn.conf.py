@@ -0,0 +1,55 @@
+import os
+
+
+def container_cpu_limit():
+    """CPUs available to this container: the cgroup CPU quota if one is set, otherwise the host CPU count."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+    return os.cpu_count() or 1
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+# Classic (2 x CPUs) + 1 sizing, overridable with WEB_CONCURRENCY
+workers = int(os.getenv("WEB_CONCURRENCY", str(container_cpu_limit() * 2 + 1)))
+# Threads let a worker keep serving page views while one of its threads waits on I/O. The Docker
+# image overrides this with -k uvicorn_worker.UvicornWorker for asgi:app (threads: WSGI_THREADS).
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# Generation through /generate can take as long as the LLM read timeout
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    # Every worker runs generation job threads; the scheduler file lock lets exactly one run cron jobs
+    from app import start_background_services
+    start_background_services()
+
+
+def on_starting(server):
+    # Metric snapshots of workers from a previous run would otherwise be added to this run's totals
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(metrics_dir, name))
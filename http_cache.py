@@ -0,0 +1,88 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Request, Response
+
+# Set on responses to write requests; nginx skips its micro-cache for clients that carry it,
+# so whoever just changed something sees the change on the next page load
+FRESH_WRITE_COOKIE = "blog_fresh"
+
+
+def make_etag(*parts) -> str:
+    """Builds an ETag value from the versions a page depends on (content hashes, counters, template fingerprint)."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def directory_fingerprint(path: str) -> str:
+    """
+    Hash of every file name and file body under a directory.
+
+    Used to fold the template set into page ETags, so a deploy that changes a
+    template invalidates cached pages without any code change.
+
+    Args:
+        path (str): Directory to fingerprint
+
+    Returns:
+        str: Hex digest (stable across processes for identical files)
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """
+    Evaluates the request's conditional headers against a page's validators.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110). ETags
+    are compared weakly, since nginx weakens them when it gzips a response.
+
+    Args:
+        request (Request): The incoming request
+        etag (str): Current ETag value of the page
+        last_modified (Optional[float]): Unix time the page last changed
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent
+    """
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def add_validators(response: Response, etag: str, last_modified: Optional[float] = None,
+                   shared_max_age: int = 0) -> Response:
+    """
+    Sets ETag, Last-Modified and Cache-Control on a page response.
+
+    Browsers must revalidate on every use (``max-age=0``); shared caches such
+    as the nginx micro-cache may reuse the response for ``shared_max_age``
+    seconds and then revalidate with a conditional request.
+    """
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    if shared_max_age:
+        response.cache_control.s_maxage = shared_max_age
+    return response
+
+
+def mark_fresh_write(response: Response, seconds: int):
+    """Tells nginx to bypass its micro-cache for this client until any cached copy has expired."""
+    response.set_cookie(FRESH_WRITE_COOKIE, "1", max_age=seconds + 1, httponly=True, samesite="Lax")
@@ -0,0 +1,317 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its pending limit."""
+
+
+class JobQueue:
+    """
+    Persistent generation job queue served by a bounded pool of worker threads.
+
+    Jobs are rows in a SQLite table, so work that is queued (or was running
+    when the process died) is picked up again after a restart. Workers claim
+    jobs with an atomic status update, which also makes it safe for several
+    processes to share the same table. Submitting a keyword that already has a
+    queued or running job returns that job instead of creating a new one.
+
+    ``max_running`` limits running jobs across every process sharing the
+    table: the running count is checked in the same transaction that claims a
+    job. Running jobs are kept alive by a heartbeat, so a job whose process
+    died is requeued (and frees its slot) after ``stale_after`` seconds, unless
+    it has already been started ``max_attempts`` times: then it is marked
+    failed, so a job that keeps killing its process cannot loop forever.
+    Finished jobs are deleted once they are older than ``retention`` seconds.
+    """
+
+    def __init__(self, db_path: str, handler: Callable[[str], Dict],
+                 key_fn: Callable[[str], str] = lambda keyword: keyword,
+                 max_workers: int = 2, max_pending: int = 100, max_running: Optional[int] = None,
+                 poll_interval: float = 1.0, heartbeat_interval: float = 15.0, stale_after: float = 120.0,
+                 retention: float = 7 * 24 * 3600.0, prune_interval: float = 3600.0, max_attempts: int = 3):
+        """
+        Args:
+            db_path (str): SQLite file holding the job table
+            handler (Callable[[str], Dict]): Runs one job for a keyword and returns its JSON-serializable result
+            key_fn (Callable[[str], str]): Maps a keyword to its dedupe key
+            max_workers (int): Worker threads in this process
+            max_pending (int): Maximum queued jobs before submissions are rejected
+            max_running (Optional[int]): Maximum running jobs across all processes (default max_workers)
+            poll_interval (float): Seconds idle workers wait before re-checking the table
+            heartbeat_interval (float): Seconds between heartbeats of this process's running jobs
+            stale_after (float): Seconds without a heartbeat after which a running job is assumed orphaned and requeued
+            retention (float): Seconds finished (done or failed) jobs are kept
+            prune_interval (float): Seconds between deletions of expired finished jobs
+            max_attempts (int): Times a job may be started before an orphaned run marks it failed
+        """
+        self.db_path = db_path
+        self.handler = handler
+        self.key_fn = key_fn
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_running = max_running if max_running is not None else max_workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running: Set[str] = set()
+        self._running_lock = threading.Lock()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._start_lock = threading.Lock()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                   id TEXT PRIMARY KEY,
+                   keyword TEXT NOT NULL,
+                   dedupe_key TEXT NOT NULL,
+                   status TEXT NOT NULL,
+                   result TEXT,
+                   error TEXT,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   created_at REAL NOT NULL,
+                   started_at REAL,
+                   finished_at REAL,
+                   heartbeat_at REAL
+               )"""
+        )
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat_at" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at) WHERE finished_at IS NOT NULL")
+
+    def start(self):
+        """Requeues orphaned jobs and starts the worker threads (idempotent)."""
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stopping = False
+            self._stopped.clear()
+            requeued = self._requeue_stale()
+            if requeued:
+                logger.info(f"Requeued {requeued} interrupted generation jobs")
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._maintenance_loop, name="job-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Signals workers to exit after their current job and waits for them."""
+        with self._start_lock:
+            self._stopping = True
+            self._stopped.set()
+            with self._wakeup:
+                self._wakeup.notify_all()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def submit(self, keyword: str) -> Tuple[Dict, bool]:
+        """
+        Queues a generation job for a keyword.
+
+        Returns:
+            Tuple[Dict, bool]: The job, and True if it was newly created (False if an
+            identical in-flight job was returned instead)
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued
+        """
+        self.start()
+        dedupe_key = self.key_fn(keyword)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = conn.execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (dedupe_key, QUEUED, RUNNING),
+            ).fetchone()
+            if existing:
+                conn.execute("COMMIT")
+                return _job_to_dict(existing), False
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Generation queue is full ({pending} jobs pending)")
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, keyword, dedupe_key, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, keyword, dedupe_key, QUEUED, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._wakeup:
+            self._wakeup.notify()
+        return self.get(job_id), True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Returns a job by id, or None if it does not exist."""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_to_dict(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        counts["workers"] = self.max_workers if self._threads else 0
+        counts["max_running"] = self.max_running
+        return counts
+
+    def prune(self) -> int:
+        """Deletes finished jobs older than the retention period; returns how many were deleted."""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE finished_at < ?", (time.time() - self.retention,)
+        )
+        return cursor.rowcount
+
+    def _requeue_stale(self) -> int:
+        """Requeues orphaned running jobs (failing those out of attempts); returns how many were requeued."""
+        conn = self._connect()
+        now = time.time()
+        cutoff = now - self.stale_after
+        failed = conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, heartbeat_at = NULL "
+            "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+            (FAILED, f"Interrupted {self.max_attempts} times (its process stopped while running it)", now,
+             RUNNING, cutoff, self.max_attempts),
+        ).rowcount
+        if failed:
+            logger.warning(f"Failed {failed} generation jobs interrupted {self.max_attempts} times")
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL "
+            "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+            (QUEUED, RUNNING, cutoff),
+        )
+        return cursor.rowcount
+
+    def _heartbeat(self):
+        with self._running_lock:
+            running = list(self._running)
+        if running:
+            self._connect().execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({','.join('?' * len(running))})",
+                (time.time(), RUNNING, *running),
+            )
+
+    def _claim_next(self) -> Optional[Dict]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._requeue_stale()
+            # Counted under the write lock, so processes cannot together exceed max_running
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+            row = None
+            if running < self.max_running:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, now, row["id"]),
+            )
+            # The claimed job as it is now (running, with this attempt counted)
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._running_lock:
+            self._running.add(row["id"])
+        return _job_to_dict(row)
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        try:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
+        # A slot is free: let an idle worker claim the next job without waiting for its poll
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _maintenance_loop(self):
+        """Keeps this process's running jobs alive and prunes expired finished jobs."""
+        last_prune = 0.0
+        while not self._stopping:
+            try:
+                self._heartbeat()
+                if time.monotonic() - last_prune >= self.prune_interval:
+                    last_prune = time.monotonic()
+                    pruned = self.prune()
+                    if pruned:
+                        logger.info(f"Pruned {pruned} finished generation jobs")
+            except sqlite3.Error as e:
+                logger.error(f"Error maintaining generation jobs: {str(e)}")
+            self._stopped.wait(self.heartbeat_interval)
+
+    def _worker_loop(self):
+        while not self._stopping:
+            try:
+                job = self._claim_next()
+            except sqlite3.Error as e:
+                logger.error(f"Error claiming generation job: {str(e)}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+            logger.info(f"Running generation job {job['id']} for keyword: {job['keyword']}")
+            try:
+                result = self.handler(job["keyword"])
+            except Exception as e:
+                logger.error(f"Generation job {job['id']} failed: {str(e)}")
+                self._finish(job["id"], FAILED, error=str(e))
+            else:
+                self._finish(job["id"], DONE, result=result)
+
+
+def _job_to_dict(row: sqlite3.Row) -> Dict:
+    job = dict(row)
+    job.pop("dedupe_key", None)
+    job["result"] = json.loads(job["result"]) if job.get("result") else None
+    return job
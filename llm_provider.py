@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """Base class for errors raised by the LLM provider layer."""
+
+
+class RetryableLLMError(LLMError):
+    """A transient failure (rate limit, 5xx, timeout, connection error); the call may succeed later."""
+
+
+class FatalLLMError(LLMError):
+    """A failure that will not go away by retrying (bad request, auth, unexpected response)."""
+
+
+class CircuitOpenError(RetryableLLMError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+def is_retryable(error: Optional[BaseException]) -> bool:
+    """True for rate limits, server errors, timeouts and connection failures (checked through exception chains)."""
+    while error is not None:
+        if isinstance(error, RetryableLLMError):
+            return True
+        if isinstance(error, FatalLLMError):
+            return False
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        error = error.__cause__
+    return False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` transient failures in a row the breaker opens
+    and calls are rejected immediately for ``reset_timeout`` seconds. It then
+    lets a single trial call through (half-open): success closes it again,
+    failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call must not reach the API."""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("LLM endpoint unavailable (circuit breaker open)")
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError("LLM endpoint unavailable (circuit breaker half-open, trial in flight)")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Opening LLM circuit breaker after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """Ends a call that neither succeeded nor failed at the transport level (e.g. a 400)."""
+        with self._lock:
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures = 0
+
+    def abandon(self):
+        """Ends a call cut short by the caller's deadline, which says nothing about the endpoint's health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            if state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                state = self.HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+            }
+
+
+class LLMProvider:
+    """
+    Shared OpenAI-compatible client with connection pooling, explicit timeouts,
+    retries for transient errors and a circuit breaker.
+
+    One provider (and one underlying httpx connection pool) is meant to be
+    shared by every thread in the process.
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str],
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout,
+                                     write=connect_timeout, pool=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.http_client, self.client = self._create_client(base_url, api_key or "missing-api-key")
+        # A breaker passed in is shared, e.g. by the sync and async providers of one endpoint
+        self.breaker = breaker or CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "retries": 0, "failures": 0}
+
+    def _create_client(self, base_url: str, api_key: str):
+        http_client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        # Retries are handled here so they can be limited to retryable errors and fed to the breaker
+        return http_client, OpenAI(base_url=base_url, api_key=api_key, http_client=http_client,
+                                   max_retries=0, timeout=self.timeout)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _call(self, operation, deadline: Optional[float] = None):
+        """Runs one API operation with breaker checks and retries for transient errors."""
+        attempt = 0
+        while True:
+            self._check_deadline(deadline)
+            self.breaker.before_call()
+            self._count("calls")
+            try:
+                result = operation()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                attempt += 1
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: Optional[float] = None) -> float:
+        """Records a failed attempt and returns the backoff before the next one; raises if there is none."""
+        if not is_retryable(error):
+            self.breaker.release()
+            self._count("failures")
+            raise FatalLLMError(str(error)) from error
+        if deadline is not None and time.monotonic() >= deadline:
+            # Timed out because the caller's time budget capped the attempt
+            self.breaker.abandon()
+            self._count("failures")
+            raise RetryableLLMError(f"Time budget for the LLM call ran out: {str(error)}") from error
+        self.breaker.record_failure()
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if attempt >= self.max_retries or (deadline is not None and time.monotonic() + delay >= deadline):
+            self._count("failures")
+            raise RetryableLLMError(str(error)) from error
+        self._count("retries")
+        logger.warning(f"Retrying LLM call in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries}): {str(error)}")
+        return delay
+
+    @staticmethod
+    def _check_deadline(deadline: Optional[float]):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise RetryableLLMError("Time budget for the LLM call ran out")
+
+    def _timeout_until(self, deadline: Optional[float]) -> httpx.Timeout:
+        """The configured timeouts, each capped at the time left before ``deadline`` (a time.monotonic() value)."""
+        if deadline is None:
+            return self.timeout
+        left = max(deadline - time.monotonic(), 0.001)
+        return httpx.Timeout(connect=min(self.timeout.connect, left), read=min(self.timeout.read, left),
+                             write=min(self.timeout.write, left), pool=min(self.timeout.pool, left))
+
+    def chat_completion(self, deadline: Optional[float] = None, **kwargs):
+        """
+        Creates a chat completion (same arguments as client.chat.completions.create).
+
+        With ``deadline`` (a time.monotonic() value), each attempt's timeout is
+        capped at the time left and no retry starts after it.
+        """
+        return self._call(lambda: self.client.chat.completions.create(timeout=self._timeout_until(deadline), **kwargs),
+                          deadline)
+
+    def stream_chat_completion(self, **kwargs) -> Iterator[Any]:
+        """
+        Streams a chat completion, yielding chunks.
+
+        Opening the stream is retried like any other call; errors after the
+        first chunk are raised to the caller, since partial output has
+        already been consumed.
+        """
+        stream = self._call(lambda: self.client.chat.completions.create(stream=True, **kwargs))
+        try:
+            for chunk in stream:
+                yield chunk
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+                raise RetryableLLMError(str(e)) from e
+            raise FatalLLMError(str(e)) from e
+
+    def list_models(self):
+        return self._call(lambda: self.client.models.list())
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool, retry and circuit breaker statistics."""
+        with self._lock:
+            counters = dict(self._counters)
+        pool = {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "connect_timeout": self.timeout.connect,
+            "read_timeout": self.timeout.read,
+        }
+        # httpx does not expose pool occupancy publicly; read it from httpcore when available
+        connection_pool = getattr(getattr(self.http_client, "_transport", None), "_pool", None)
+        connections = getattr(connection_pool, "connections", None)
+        if connections is not None:
+            pool["open_connections"] = len(connections)
+            pool["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+        return {"pool": pool, "breaker": self.breaker.stats(), **counters}
+
+    def close(self):
+        self.http_client.close()
+
+
+class AsyncLLMProvider(LLMProvider):
+    """
+    asyncio variant of LLMProvider over AsyncOpenAI, for the ASGI app.
+
+    Calls are awaited instead of blocking a thread, so one event loop can
+    keep many slow generations in flight. Timeouts, retries, pool limits and
+    the breaker behave as in LLMProvider. The connection pool belongs to the
+    event loop that first uses it, so use one provider per loop (per worker
+    process).
+    """
+
+    def _create_client(self, base_url: str, api_key: str):
+        http_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return http_client, AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client,
+                                        max_retries=0, timeout=self.timeout)
+
+    async def _call(self, operation, deadline: Optional[float] = None):
+        """Awaits one API operation with breaker checks and retries for transient errors."""
+        attempt = 0
+        while True:
+            self._check_deadline(deadline)
+            self.breaker.before_call()
+            self._count("calls")
+            try:
+                result = await operation()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def chat_completion(self, deadline: Optional[float] = None, **kwargs):
+        """Creates a chat completion (same arguments and ``deadline`` as LLMProvider.chat_completion)."""
+        return await self._call(
+            lambda: self.client.chat.completions.create(timeout=self._timeout_until(deadline), **kwargs), deadline)
+
+    async def stream_chat_completion(self, **kwargs) -> AsyncIterator[Any]:
+        """Streams a chat completion, yielding chunks; errors are handled as in LLMProvider.stream_chat_completion."""
+        stream = await self._call(lambda: self.client.chat.completions.create(stream=True, **kwargs))
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+                raise RetryableLLMError(str(e)) from e
+            raise FatalLLMError(str(e)) from e
+        finally:
+            # A client that disconnects stops the stream early; return its connection to the pool now
+            await stream.close()
+
+    async def list_models(self):
+        return await self._call(lambda: self.client.models.list())
+
+    async def close(self):
+        await self.http_client.aclose()
@@ -0,0 +1,259 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds: sub-millisecond page work up to multi-minute LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+INF_LABEL = 'le="+Inf"'
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Histogram:
+    """Cumulative histogram (bucket counts, sum and count per label set)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observes the wall-clock duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], List]]:
+        with self._lock:
+            return [(key, [list(entry[0]), entry[1], entry[2]]) for key, entry in self._values.items()]
+
+
+class Callback:
+    """
+    Values read from another component (e.g. a cache's ``stats()``) when metrics are collected.
+
+    ``fn`` returns ``{label_values_tuple: value}``. Counters are summed across
+    processes; gauges are reported by the process serving the scrape only.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str,
+                 fn: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        try:
+            return [(tuple(str(v) for v in key), float(value)) for key, value in self.fn().items()]
+        except Exception as e:
+            logger.warning(f"Metrics callback {self.name} failed: {str(e)}")
+            return []
+
+
+class Registry:
+    """
+    Holds every metric of the process and renders them in the Prometheus text format.
+
+    With ``share(directory)`` each process periodically writes a snapshot to
+    ``directory``. ``exposition()`` then merges the snapshots of all processes,
+    so a scrape of any gunicorn worker reports totals for the whole server.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._share_dir: Optional[str] = None
+        self._share_file: Optional[str] = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, Callback):
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, kind: str,
+                 fn: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Sequence[str] = ()):
+        self._register(Callback(name, documentation, kind, fn, labelnames))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current values of every metric as a JSON-serializable dict."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            snapshot[metric.name] = {
+                "kind": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(key), value] for key, value in metric.samples()],
+            }
+        return snapshot
+
+    def share(self, directory: str, interval: float = 5.0):
+        """Starts writing this process's snapshot to ``directory`` every ``interval`` seconds."""
+        os.makedirs(directory, exist_ok=True)
+        self._share_dir = directory
+        self._share_file = os.path.join(directory, f"{os.getpid()}-{int(time.time() * 1000)}.json")
+
+        def flush_loop():
+            while True:
+                time.sleep(interval)
+                self._write_snapshot()
+
+        threading.Thread(target=flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _write_snapshot(self) -> Dict[str, Dict]:
+        snapshot = self.snapshot()
+        try:
+            tmp_path = f"{self._share_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self._share_file)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {str(e)}")
+        return snapshot
+
+    def exposition(self) -> str:
+        """Renders the metrics (merged across processes when shared) in Prometheus text format."""
+        if not self._share_dir:
+            return render(self.snapshot())
+        local = self._write_snapshot()
+        merged = json.loads(json.dumps(local))
+        for path in glob.glob(os.path.join(self._share_dir, "*.json")):
+            if path == self._share_file:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            _merge(merged, other)
+        return render(merged)
+
+
+def _merge(into: Dict[str, Dict], other: Dict[str, Dict]):
+    """Adds another process's counters and histograms to ``into``; gauges stay local."""
+    for name, metric in other.items():
+        if metric["kind"] == "gauge":
+            continue
+        target = into.setdefault(name, dict(metric, samples=[]))
+        by_labels = {tuple(labels): value for labels, value in target["samples"]}
+        for labels, value in metric["samples"]:
+            key = tuple(labels)
+            current = by_labels.get(key)
+            if current is None:
+                by_labels[key] = value
+            elif metric["kind"] == "histogram":
+                by_labels[key] = [[a + b for a, b in zip(current[0], value[0])],
+                                  current[1] + value[1], current[2] + value[2]]
+            else:
+                by_labels[key] = current + value
+        target["samples"] = [[list(key), value] for key, value in by_labels.items()]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}"
+
+
+def render(snapshot: Dict[str, Dict]) -> str:
+    """Formats a snapshot in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for labels, value in sorted(metric["samples"], key=lambda sample: sample[0]):
+            if metric["kind"] == "histogram":
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(metric["buckets"], counts):
+                    cumulative += bucket_count
+                    le = 'le="%s"' % _number(bound)
+                    lines.append(f"{name}_bucket{_labels(names, labels, le)} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(names, labels, INF_LABEL)} {count}")
+                lines.append(f"{name}_sum{_labels(names, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(names, labels)} {count}")
+            else:
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# One registry per process; modules register their metrics on import
+registry = Registry()
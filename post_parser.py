@@ -0,0 +1,122 @@
+import re
+from typing import Dict, List, Optional
+
+# Bump when parsing or rendering changes so stored renderings are rebuilt and page ETags change
+RENDER_VERSION = "2"
+
+# The title is the first H1 (outside code fences) among the first lines of text
+TITLE_SCAN_LINES = 15
+DEFAULT_TITLE = "Untitled Post"
+
+# Headings (after numbering and emphasis are stripped) that start the sources section
+SOURCE_HEADINGS = ("sources", "references", "further reading", "citations")
+
+_HEADING = re.compile(r"(#{1,6})\s+(.*?)(?:\s+#+)?$")
+_HEADING_PREFIX = re.compile(r"^[\d.)\s]+")
+_LIST_ITEM = re.compile(r"(?:[-*+]|\d+[.)])\s+(.*)")
+_LINK = re.compile(r"\[([^\]]*)\]\((https?://[^)\s]+)\)")
+_URL = re.compile(r"https?://[^\s)<>\]]+")
+_BOLD = re.compile(r"(\*\*|__)(.+?)\1")
+
+
+def _is_sources_heading(text: str) -> bool:
+    normalized = _HEADING_PREFIX.sub("", text.replace("*", "").replace("_", " ")).strip().lower()
+    return normalized.startswith(SOURCE_HEADINGS)
+
+
+def _parse_source(text: str) -> Optional[Dict[str, str]]:
+    """Turns one line of the sources section into {'title', 'url'}, or None if it has no URL."""
+    item = _LIST_ITEM.match(text)
+    if item:
+        text = item.group(1)
+    link = _LINK.search(text)
+    if link:
+        url, label, url_start = link.group(2), link.group(1), link.start()
+    else:
+        bare = _URL.search(text)
+        if not bare:
+            return None
+        url, label, url_start = bare.group(0).rstrip(".,;"), "", bare.start()
+
+    bold = _BOLD.match(text)
+    if bold:
+        title = bold.group(2)
+    elif label:
+        title = label
+    else:
+        # "Title: description (https://...)" or "Title - https://..."
+        title = text[:url_start].split(":")[0]
+    title = title.strip(" \t-–:(*_")
+    return {"title": title or url, "url": url}
+
+
+def parse_post(markdown_content: str) -> Dict:
+    """
+    Parses a generated post in a single pass over its lines.
+
+    Headings inside fenced code blocks are ignored. The sources section is
+    the part under a heading such as "Sources" or "### 6. References", up to
+    the next heading of the same or a higher level.
+
+    Args:
+        markdown_content (str): The post's Markdown
+
+    Returns:
+        Dict: ``title``; ``outline`` (one {'level', 'text'} per heading outside the
+        sources section); ``sources`` ({'title', 'url'} per source); ``links``
+        (other URLs in the body); ``word_count`` (words in the body, code excluded);
+        and ``body``, the Markdown without the sources section
+    """
+    title = None
+    outline: List[Dict] = []
+    sources: List[Dict[str, str]] = []
+    links: List[str] = []
+    body: List[str] = []
+    word_count = 0
+    in_code = False
+    sources_level = None  # level of the sources heading while inside that section
+    first_text_line = None
+
+    for index, line in enumerate(markdown_content.splitlines(keepends=True)):
+        stripped = line.strip()
+        if first_text_line is None and stripped:
+            first_text_line = index
+
+        if stripped.startswith(("```", "~~~")):
+            in_code = not in_code
+        elif not in_code and stripped.startswith("#"):
+            heading = _HEADING.match(stripped)
+            if heading:
+                level, text = len(heading.group(1)), heading.group(2)
+                if sources_level is not None and level <= sources_level:
+                    sources_level = None
+                if sources_level is None:
+                    if _is_sources_heading(text):
+                        sources_level = level
+                        continue
+                    if level == 1 and title is None and index - first_text_line < TITLE_SCAN_LINES:
+                        title = text
+                    outline.append({"level": level, "text": text})
+
+        if sources_level is not None:
+            if stripped:
+                source = _parse_source(stripped)
+                if source:
+                    sources.append(source)
+            continue
+
+        body.append(line)
+        if not in_code and stripped:
+            word_count += len(stripped.split())
+            if "http" in stripped:
+                links.extend(url for _, url in _LINK.findall(stripped))
+                links.extend(url.rstrip(".,;") for url in _URL.findall(_LINK.sub("", stripped)))
+
+    return {
+        "title": title or DEFAULT_TITLE,
+        "outline": outline,
+        "sources": sources,
+        "links": links,
+        "word_count": word_count,
+        "body": "".join(body),
+    }
@@ -0,0 +1,188 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlite_util import connect, transaction
+
+logger = logging.getLogger(__name__)
+
+REVIEW_FILE_SUFFIX = "_reviews.json"
+
+
+class ReviewStore:
+    """
+    SQLite-backed review storage: one row per review, indexed by post keyword.
+
+    Appending a review is a single INSERT, so concurrent submissions from any
+    number of threads or processes never overwrite each other and the cost
+    does not grow with the number of existing reviews. A per-post summary row
+    (review count, a version number bumped on every change and the time of
+    that change) is maintained in the same transaction, so counts and HTTP
+    validators never require scanning reviews.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS reviews (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   keyword TEXT NOT NULL,
+                   name TEXT NOT NULL,
+                   review TEXT NOT NULL,
+                   timestamp TEXT NOT NULL,
+                   created_at REAL NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS reviews_keyword ON reviews (keyword, id DESC)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS review_summary (
+                   keyword TEXT PRIMARY KEY,
+                   count INTEGER NOT NULL,
+                   version INTEGER NOT NULL,
+                   updated_at REAL NOT NULL DEFAULT 0
+               )"""
+        )
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(review_summary)")]
+        if "updated_at" not in columns:
+            conn.execute("ALTER TABLE review_summary ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Closes the calling thread's connection, if any."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def add(self, keyword: str, review: Dict[str, str]):
+        """Appends one review ({'name', 'review', 'timestamp'}) to a post."""
+        self.add_many(keyword, [review])
+
+    def add_many(self, keyword: str, reviews: List[Dict[str, str]], created_at: Optional[List[float]] = None):
+        """Appends several reviews to a post in one transaction, in the given (oldest first) order."""
+        if not reviews:
+            return
+        now = time.time()
+        times = created_at or [now] * len(reviews)
+        conn = self._connect()
+        with transaction(conn):
+            conn.executemany(
+                "INSERT INTO reviews (keyword, name, review, timestamp, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(keyword, r["name"], r["review"], r["timestamp"], t) for r, t in zip(reviews, times)],
+            )
+            conn.execute(
+                """INSERT INTO review_summary (keyword, count, version, updated_at) VALUES (?, ?, 1, ?)
+                   ON CONFLICT(keyword) DO UPDATE SET
+                       count = count + excluded.count,
+                       version = version + 1,
+                       updated_at = excluded.updated_at""",
+                (keyword, len(reviews), now),
+            )
+
+    def list(self, keyword: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, str]]:
+        """
+        Returns reviews for a post, newest first.
+
+        Args:
+            keyword (str): Sanitized keyword of the post
+            limit (Optional[int]): Maximum number of reviews (all if None)
+            offset (int): Number of newest reviews to skip
+
+        Returns:
+            List[Dict[str, str]]: Reviews with name, review and timestamp
+        """
+        rows = self._connect().execute(
+            """SELECT name, review, timestamp FROM reviews WHERE keyword = ?
+               ORDER BY id DESC LIMIT ? OFFSET ?""",
+            (keyword, -1 if limit is None else limit, offset),
+        )
+        return [dict(row) for row in rows]
+
+    def count(self, keyword: str) -> int:
+        return self.summary(keyword)["count"]
+
+    def summary(self, keyword: str) -> Dict[str, float]:
+        """Review count, change version and last change time for a post (all 0 if it has no reviews)."""
+        row = self._connect().execute(
+            "SELECT count, version, updated_at FROM review_summary WHERE keyword = ?", (keyword,)
+        ).fetchone()
+        return dict(row) if row else {"count": 0, "version": 0, "updated_at": 0}
+
+    def delete(self, keyword: str):
+        """Deletes every review of a post. The summary row is kept (count 0) so its version keeps increasing."""
+        conn = self._connect()
+        with transaction(conn):
+            conn.execute("DELETE FROM reviews WHERE keyword = ?", (keyword,))
+            conn.execute(
+                "UPDATE review_summary SET count = 0, version = version + 1, updated_at = ? WHERE keyword = ?",
+                (time.time(), keyword),
+            )
+
+    def clear(self):
+        conn = self._connect()
+        with transaction(conn):
+            conn.execute("DELETE FROM reviews")
+            conn.execute("UPDATE review_summary SET count = 0, version = version + 1, updated_at = ?", (time.time(),))
+
+    def migrate_from_json_dir(self, reviews_dir: str) -> int:
+        """
+        One-shot import of the legacy reviews/<keyword>_reviews.json files.
+
+        The files are left in place; the migration is recorded in the meta table
+        so it never runs twice.
+
+        Returns:
+            int: Number of reviews imported
+        """
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+            return 0
+        legacy = {}
+        mtimes = {}
+        for path in sorted(glob.glob(os.path.join(reviews_dir, f"*{REVIEW_FILE_SUFFIX}"))):
+            keyword = os.path.basename(path)[:-len(REVIEW_FILE_SUFFIX)]
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    legacy[keyword] = [r for r in json.load(f) if r.get("name") and r.get("review")]
+                mtimes[keyword] = os.path.getmtime(path)
+            except Exception as e:
+                logger.error(f"Skipping unreadable review file {path}: {str(e)}")
+
+        imported = 0
+        with transaction(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+                return 0
+            for keyword, reviews in legacy.items():
+                conn.executemany(
+                    "INSERT INTO reviews (keyword, name, review, timestamp, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(keyword, r["name"], r["review"], r.get("timestamp", ""), mtimes[keyword])
+                     for r in reviews],
+                )
+                conn.execute(
+                    """INSERT INTO review_summary (keyword, count, version, updated_at) VALUES (?, ?, 1, ?)
+                       ON CONFLICT(keyword) DO UPDATE SET count = count + excluded.count, version = version + 1,
+                           updated_at = excluded.updated_at""",
+                    (keyword, len(reviews), mtimes[keyword]),
+                )
+                imported += len(reviews)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (json.dumps({"source": reviews_dir, "count": imported, "at": time.time()}),),
+            )
+        if imported:
+            logger.info(f"Migrated {imported} reviews from {reviews_dir} to {self.db_path}")
+        return imported
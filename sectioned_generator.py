@@ -0,0 +1,361 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from ai_generator import complete, complete_async
+from llm_provider import CircuitOpenError, FatalLLMError, LLMError, RetryableLLMError
+
+logger = logging.getLogger(__name__)
+
+# Whole-post budget (outline plus sections, retries included); unfinished sections fail the generation
+SECTIONED_TIME_BUDGET = float(os.getenv("SECTIONED_TIME_BUDGET_SECONDS", "120"))
+# Attempts per outline or section call, each on top of the provider's own transport retries
+SECTION_ATTEMPTS = int(os.getenv("SECTION_ATTEMPTS", "2"))
+MIN_MAIN_SECTIONS = 2
+MAX_MAIN_SECTIONS = 4
+OUTLINE_MAX_TOKENS = 600
+
+# Per kind of section: default heading, length and what it must contain (the single-shot prompt's sections 2-6).
+# max_tokens leaves headroom over the word target (about 1.3 tokens per word) so sections are not cut off.
+SECTION_SPECS: Dict[str, Dict[str, Any]] = {
+    "introduction": {
+        "heading": "Introduction",
+        "words": 150,
+        "max_tokens": 500,
+        "instructions": "Two paragraphs of about five lines each. Start with a relatable hook or question, "
+                        "explain what the topic is in simple terms, highlight why it matters to everyday readers "
+                        "and tell them what they will gain from reading.",
+    },
+    "main": {
+        "heading": "Understanding {keyword}",
+        "words": 220,
+        "max_tokens": 800,
+        "instructions": "Use simple explanations with analogies and real-world comparisons, practical examples "
+                        "readers can relate to and step-by-step breakdowns where a process is involved. Include "
+                        "a relevant statistic with its context where it fits.",
+    },
+    "future": {
+        "heading": "The Future of {keyword}",
+        "words": 130,
+        "max_tokens": 500,
+        "instructions": "Discuss emerging trends in accessible language, explain potential challenges or "
+                        "opportunities and help readers understand what to watch for.",
+    },
+    "conclusion": {
+        "heading": "Key Takeaways and Next Steps",
+        "words": 130,
+        "max_tokens": 500,
+        "instructions": "Summarize the key takeaways in simple bullet points, give actionable next steps for "
+                        "interested readers and end with an engaging call-to-action or something memorable.",
+    },
+    "sources": {
+        "heading": "Sources",
+        "words": 80,
+        "max_tokens": 400,
+        "instructions": "List 3-5 reputable, authoritative and accessible sources as Markdown bullets in the "
+                        "form `- **Source Title**: Brief description (https://example.com/...)`.",
+    },
+}
+SECTION_ORDER = ["introduction", "main", "future", "conclusion", "sources"]
+
+_HEADING_LINE = re.compile(r"#{1,2}\s[^\n]*\n*")
+
+SYSTEM_MESSAGE = {
+    "role": "developer",
+    "content": "You are a professional blog writer specializing in creating SEO-optimized content."
+}
+
+
+def outline_messages(keyword: str, seo_data: Dict[str, float]) -> List[Dict[str, str]]:
+    """
+    Build the chat messages asking for a post's outline as JSON.
+
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+
+    Returns:
+        List[Dict[str, str]]: Chat completion messages (system prompt and user prompt)
+    """
+    prompt = f"""Plan an engaging and educational blog post about {keyword} that's perfect for learners and general audiences.
+
+    SEO Metrics:
+    - Search Volume: {seo_data['search_volume']}
+    - Keyword Difficulty: {seo_data['keyword_difficulty']}
+    - Average CPC: ${seo_data['avg_cpc']}
+
+    Return only a JSON object of this shape:
+    {{"title": "...", "sections": [{{"kind": "introduction", "heading": "", "points": ["..."]}}, {{"kind": "main", "heading": "...", "points": ["..."]}}, {{"kind": "future", "heading": "...", "points": ["..."]}}, {{"kind": "conclusion", "heading": "Key Takeaways and Next Steps", "points": ["..."]}}, {{"kind": "sources", "heading": "Sources", "points": []}}]}}
+
+    - title: clear and compelling, accurately represents the content, appeals to beginners, avoids clickbait and includes the main keyword naturally
+    - sections, in this order: one "introduction", {MIN_MAIN_SECTIONS} to {MAX_MAIN_SECTIONS} "main" sections organized the way that makes most sense for the topic (simple explanations, practical examples, step-by-step breakdowns, common misconceptions, benefits and challenges, current trends, real-world applications), one "future" outlook, one "conclusion" and one "sources"
+    - points: 2-4 short phrases per section saying what it covers, so that no two sections repeat each other
+    - If the keyword is ambiguous, choose the most commonly searched interpretation"""
+    return [SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+
+def default_outline(keyword: str) -> Dict[str, Any]:
+    """The outline used when the model's outline cannot be parsed: every kind of section with default headings."""
+    sections = [{"kind": kind, "heading": SECTION_SPECS[kind]["heading"].format(keyword=keyword.title()), "points": []}
+                for kind in SECTION_ORDER]
+    return {"title": keyword.title(), "sections": sections}
+
+
+def parse_outline(text: str, keyword: str) -> Dict[str, Any]:
+    """
+    Parse the model's outline into ``{"title": ..., "sections": [...]}``.
+
+    Sections come back in SECTION_ORDER with exactly one of every kind except
+    "main" (at most MAX_MAIN_SECTIONS). Missing or malformed parts are filled
+    in from default_outline, so the result is always usable.
+
+    Args:
+        text (str): The outline completion (a JSON object, possibly wrapped in prose or a code fence)
+        keyword (str): The main keyword for the blog post
+
+    Returns:
+        Dict[str, Any]: The title and the list of section dicts (kind, heading, points)
+    """
+    fallback = default_outline(keyword)
+    try:
+        outline = json.loads(text[text.index("{"):text.rindex("}") + 1])
+    except ValueError:
+        logger.warning(f"Unparseable outline for keyword: {keyword}; using the default outline")
+        return fallback
+    if not isinstance(outline, dict):
+        return fallback
+
+    by_kind: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in SECTION_ORDER}
+    listed = outline.get("sections")
+    for section in listed if isinstance(listed, list) else []:
+        if not isinstance(section, dict) or str(section.get("kind")) not in by_kind:
+            continue
+        heading = str(section.get("heading") or "").strip().lstrip("#").strip()
+        points = section.get("points") if isinstance(section.get("points"), list) else []
+        points = [str(point).strip() for point in points if str(point).strip()]
+        by_kind[section["kind"]].append({"kind": section["kind"], "heading": heading, "points": points})
+
+    sections = []
+    for default in fallback["sections"]:
+        kind = default["kind"]
+        for section in by_kind[kind][:MAX_MAIN_SECTIONS if kind == "main" else 1] or [default]:
+            sections.append(dict(section, heading=section["heading"] or default["heading"]))
+    title = str(outline.get("title") or "").strip().lstrip("#").strip()
+    return {"title": title or fallback["title"], "sections": sections}
+
+
+def section_messages(keyword: str, outline: Dict[str, Any], section: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for one section, with the whole outline as context.
+
+    Args:
+        keyword (str): The main keyword for the blog post
+        outline (Dict[str, Any]): The post's outline (parse_outline)
+        section (Dict[str, Any]): The section to write, one of ``outline["sections"]``
+
+    Returns:
+        List[Dict[str, str]]: Chat completion messages (system prompt and user prompt)
+    """
+    spec = SECTION_SPECS[section["kind"]]
+    plan = "\n".join(f"    - {item['heading']}: {'; '.join(item['points']) or item['kind']}"
+                     for item in outline["sections"])
+    covers = "; ".join(section["points"]) or f"the {section['kind']} of the post"
+    prompt = f"""You are writing one section of the blog post "{outline['title']}" about {keyword}, for learners and general audiences.
+    The sections are written separately; this is the whole post's outline, so do not cover other sections' points:
+{plan}
+
+    Write the section "{section['heading']}", covering: {covers}.
+    {spec['instructions']}
+    Length: about {spec['words']} words.
+
+    Tone & style: conversational yet informative, address readers as "you", explain technical terms when first introduced, use helpful analogies and the occasional rhetorical question.
+    Formatting: proper Markdown, bullet points for easy scanning, bold key terms, italics sparingly, ### subheadings only if the section needs them.
+
+    **Return only the section's Markdown, without its heading or the post title. Do not include meta-commentary or instructions."""
+    return [SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+
+def stitch_post(outline: Dict[str, Any], bodies: List[str]) -> str:
+    """
+    Join the title and section bodies into one Markdown post.
+
+    The introduction goes unheaded under the title; every other section gets
+    its ``## `` heading. A title or heading the model repeated at the top of a
+    body is dropped.
+
+    Args:
+        outline (Dict[str, Any]): The post's outline (parse_outline)
+        bodies (List[str]): Section bodies, in the order of ``outline["sections"]``
+
+    Returns:
+        str: The blog post in Markdown format
+    """
+    parts = [f"# {outline['title']}"]
+    for section, body in zip(outline["sections"], bodies):
+        body = body.strip()
+        while _HEADING_LINE.match(body):
+            body = _HEADING_LINE.sub("", body, count=1).strip()
+        parts.append(body if section["kind"] == "introduction" else f"## {section['heading']}\n\n{body}")
+    return "\n\n".join(parts) + "\n"
+
+
+def outline_call(keyword: str, seo_data: Dict[str, float]) -> Dict[str, Any]:
+    """The write_part arguments for the outline."""
+    return {"messages": outline_messages(keyword, seo_data), "max_tokens": OUTLINE_MAX_TOKENS,
+            "mode": "outline", "what": "outline"}
+
+
+def section_calls(keyword: str, outline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The write_part arguments for each section of ``outline``, in order."""
+    return [{"messages": section_messages(keyword, outline, section),
+             "max_tokens": SECTION_SPECS[section["kind"]]["max_tokens"],
+             "mode": "section",
+             "what": f"section '{section['heading']}'"}
+            for section in outline["sections"]]
+
+
+def checked_part(text: str, what: str, keyword: str) -> str:
+    """Returns a completed outline or section, raising a retryable error if the model returned nothing."""
+    if not text.strip():
+        raise RetryableLLMError(f"Empty {what} for {keyword}")
+    return text
+
+
+def retry_or_raise(error: LLMError, attempt: int, what: str, keyword: str, deadline: float):
+    """Raises a failed outline or section call's error unless the call gets another attempt."""
+    # An open breaker or a rejected request will fail the same way again
+    if (isinstance(error, (CircuitOpenError, FatalLLMError))
+            or attempt >= SECTION_ATTEMPTS or time.monotonic() >= deadline):
+        raise error
+    logger.warning(f"Retrying {what} for keyword: {keyword} (attempt {attempt + 1}/{SECTION_ATTEMPTS}): {error}")
+
+
+def write_part(messages: List[Dict[str, str]], max_tokens: int, mode: str, what: str, keyword: str,
+               force: bool, deadline: float) -> str:
+    """One outline or section completion, retried up to SECTION_ATTEMPTS times while the budget lasts."""
+    for attempt in itertools.count(1):
+        try:
+            return checked_part(complete(messages, max_tokens, mode, keyword, force=force, deadline=deadline),
+                                what, keyword)
+        except LLMError as e:
+            retry_or_raise(e, attempt, what, keyword, deadline)
+
+
+async def write_part_async(messages: List[Dict[str, str]], max_tokens: int, mode: str, what: str, keyword: str,
+                           force: bool, deadline: float) -> str:
+    """write_part for the event loop."""
+    for attempt in itertools.count(1):
+        try:
+            return checked_part(await complete_async(messages, max_tokens, mode, keyword, force=force,
+                                                     deadline=deadline), what, keyword)
+        except LLMError as e:
+            retry_or_raise(e, attempt, what, keyword, deadline)
+
+
+def unfinished_error(keyword: str, outline: Dict[str, Any], done: List[bool], budget: float) -> RetryableLLMError:
+    missing = [section["heading"] for section, finished in zip(outline["sections"], done) if not finished]
+    return RetryableLLMError(f"Sectioned generation for '{keyword}' exceeded its {budget:.0f}s budget; "
+                             f"unfinished sections: {', '.join(missing)}")
+
+
+def generate_sectioned_post(keyword: str, seo_data: Dict[str, float], force: bool = False,
+                            time_budget: Optional[float] = None) -> str:
+    """
+    Generate a blog post from an outline call plus one concurrent call per section.
+
+    The outline is one short completion; the sections are then written in
+    parallel and stitched together, so the post takes about as long as the
+    outline plus the slowest section rather than the whole text in one call.
+    Each call is cached on its own, so a retried generation only re-runs the
+    sections that failed.
+
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+        force (bool): Skip the completion cache and always call the API
+        time_budget (Optional[float]): Seconds for the whole post (default SECTIONED_TIME_BUDGET)
+
+    Returns:
+        str: Generated blog post in Markdown format
+
+    Raises:
+        LLMError: A call failed after its retries, or sections were unfinished when the budget ran out
+    """
+    budget = time_budget or SECTIONED_TIME_BUDGET
+    deadline = time.monotonic() + budget
+    start = time.perf_counter()
+    logger.info(f"Generating sectioned blog post for keyword: {keyword}")
+
+    outline = parse_outline(write_part(keyword=keyword, force=force, deadline=deadline,
+                                       **outline_call(keyword, seo_data)), keyword)
+    calls = section_calls(keyword, outline)
+    executor = ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix="section")
+    try:
+        futures = [executor.submit(write_part, keyword=keyword, force=force, deadline=deadline, **call)
+                   for call in calls]
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_EXCEPTION)
+    finally:
+        # Calls still running stop on their own: their timeouts are capped at the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    done = [future.done() and not future.cancelled() for future in futures]
+    errors = [future.exception() for future, finished in zip(futures, done) if finished and future.exception()]
+    if errors:
+        raise errors[0]
+    if not all(done):
+        raise unfinished_error(keyword, outline, done, budget)
+
+    post = stitch_post(outline, [future.result() for future in futures])
+    logger.info(f"Generated {len(calls)} sections for keyword: {keyword} in {time.perf_counter() - start:.2f}s")
+    return post
+
+
+async def generate_sectioned_post_async(keyword: str, seo_data: Dict[str, float], force: bool = False,
+                                        time_budget: Optional[float] = None) -> str:
+    """
+    generate_sectioned_post for the event loop: the sections are concurrent
+    tasks instead of threads.
+
+    Args:
+        keyword (str): The main keyword for the blog post
+        seo_data (Dict[str, float]): SEO metrics for the keyword
+        force (bool): Skip the completion cache and always call the API
+        time_budget (Optional[float]): Seconds for the whole post (default SECTIONED_TIME_BUDGET)
+
+    Returns:
+        str: Generated blog post in Markdown format
+    """
+    budget = time_budget or SECTIONED_TIME_BUDGET
+    deadline = time.monotonic() + budget
+    start = time.perf_counter()
+    logger.info(f"Generating sectioned blog post for keyword: {keyword}")
+
+    outline = parse_outline(await write_part_async(keyword=keyword, force=force, deadline=deadline,
+                                                   **outline_call(keyword, seo_data)), keyword)
+    calls = section_calls(keyword, outline)
+    tasks = [asyncio.create_task(write_part_async(keyword=keyword, force=force, deadline=deadline, **call))
+             for call in calls]
+    try:
+        await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()),
+                           return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # Also runs when the request itself is cancelled, e.g. on client disconnect
+        for task in tasks:
+            task.cancel()
+
+    done = [task.done() and not task.cancelled() for task in tasks]
+    errors = [task.exception() for task, finished in zip(tasks, done) if finished and task.exception()]
+    if errors:
+        raise errors[0]
+    if not all(done):
+        raise unfinished_error(keyword, outline, done, budget)
+
+    post = stitch_post(outline, [task.result() for task in tasks])
+    logger.info(f"Generated {len(calls)} sections for keyword: {keyword} in {time.perf_counter() - start:.2f}s")
+    return post
@@ -1,28 +1,183 @@
+import logging
+import os
 import random
-from typing import Dict
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class SEOBackend:
+    """Interface for SEO metric sources. Implementations fetch many keywords per call."""
+
+    def fetch_many(self, keywords: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Fetch SEO metrics for several keywords.
+
+        Args:
+            keywords (List[str]): Keywords to look up
+
+        Returns:
+            Dict[str, Dict[str, float]]: Metrics keyed by keyword (missing keywords are omitted)
+        """
+        raise NotImplementedError
+
+
+class MockSEOBackend(SEOBackend):
+    """
+    Mock implementation that returns random data.
+    The numbers are seeded by the keyword, so a keyword always gets the same metrics.
+    """
+
+    # Mock data ranges
+    search_volume_range = (1000, 100000)
+    difficulty_range = (0, 100)
+    cpc_range = (0.5, 10.0)
+
+    def fetch_many(self, keywords: List[str]) -> Dict[str, Dict[str, float]]:
+        results = {}
+        for keyword in keywords:
+            rng = random.Random(keyword.lower())
+            # Generate random data within ranges
+            results[keyword] = {
+                "search_volume": rng.randint(*self.search_volume_range),
+                "keyword_difficulty": rng.randint(*self.difficulty_range),
+                "avg_cpc": round(rng.uniform(*self.cpc_range), 2)
+            }
+        return results
+
+
+class StaticSEOBackend(SEOBackend):
+    """Local fake backend serving fixed metrics; records every batch it is asked for."""
+
+    def __init__(self, data: Optional[Dict[str, Dict[str, float]]] = None,
+                 default: Optional[Dict[str, float]] = None):
+        self.data = data or {}
+        self.default = default or {"search_volume": 1000, "keyword_difficulty": 50, "avg_cpc": 1.0}
+        self.calls: List[List[str]] = []
+
+    def fetch_many(self, keywords: List[str]) -> Dict[str, Dict[str, float]]:
+        self.calls.append(list(keywords))
+        return {keyword: dict(self.data.get(keyword, self.default)) for keyword in keywords}
+
+
+class HTTPSEOBackend(SEOBackend):
+    """
+    Backend for an HTTP SEO metrics API.
+
+    Sends ``POST {base_url}/keywords`` with ``{"keywords": [...]}`` and expects
+    ``{"results": {keyword: {"search_volume": ..., "keyword_difficulty": ...,
+    "avg_cpc": ...}}}``. Requests are split into chunks of ``batch_size``.
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 timeout: float = 10.0, batch_size: int = 100):
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def fetch_many(self, keywords: List[str]) -> Dict[str, Dict[str, float]]:
+        results = {}
+        for start in range(0, len(keywords), self.batch_size):
+            chunk = keywords[start:start + self.batch_size]
+            response = self.session.post(f"{self.base_url}/keywords", json={"keywords": chunk},
+                                         timeout=self.timeout)
+            response.raise_for_status()
+            results.update(response.json().get("results", {}))
+        return results
+
+
+class SEOProvider:
+    """
+    Memoizing front for an SEOBackend.
+
+    Results are kept in memory for ``ttl_seconds``; lookups for several
+    keywords fetch all misses from the backend in one batch.
+    """
+
+    def __init__(self, backend: SEOBackend, ttl_seconds: float = 24 * 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keywords: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        keywords = list(dict.fromkeys(keywords))
+        now = time.time()
+        results = {}
+        missing = []
+        with self._lock:
+            for keyword in keywords:
+                cached = self._cache.get(keyword)
+                if cached and now - cached[0] < self.ttl_seconds:
+                    results[keyword] = dict(cached[1])
+                    self.hits += 1
+                else:
+                    missing.append(keyword)
+                    self.misses += 1
+        if missing:
+            fetched = self.backend.fetch_many(missing)
+            with self._lock:
+                for keyword, data in fetched.items():
+                    self._cache[keyword] = (now, data)
+            results.update({keyword: dict(data) for keyword, data in fetched.items()})
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def create_backend_from_env() -> SEOBackend:
+    """Selects the backend from SEO_BACKEND ("mock" or "http"; the latter needs SEO_API_URL)."""
+    backend = os.getenv("SEO_BACKEND", "mock").lower()
+    if backend == "http":
+        return HTTPSEOBackend(os.environ["SEO_API_URL"], api_key=os.getenv("SEO_API_KEY"),
+                              timeout=float(os.getenv("SEO_API_TIMEOUT", "10")))
+    return MockSEOBackend()
+
+
+provider = SEOProvider(create_backend_from_env(),
+                       ttl_seconds=float(os.getenv("SEO_CACHE_TTL_SECONDS", str(24 * 3600))))
+
+
+def get_seo_data_many(keywords: Iterable[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Get SEO metrics for several keywords with one backend request for all cache misses.
+
+    Args:
+        keywords (Iterable[str]): The keywords to get SEO data for
+
+    Returns:
+        Dict[str, Dict[str, float]]: SEO metrics keyed by keyword
+    """
+    return provider.get_many(keywords)
+
 
 def get_seo_data(keyword: str) -> Dict[str, float]:
     """
     Get SEO metrics for a given keyword.
-    This is a mock implementation that returns random data.
-    In a real implementation, this would call an SEO API.
-    
+    Served from the provider's TTL cache; the configured backend (mock by default) is only called on a miss.
+
     Args:
         keyword (str): The keyword to get SEO data for
-        
+
     Returns:
         Dict[str, float]: Dictionary containing SEO metrics
     """
-    # Mock data ranges
-    search_volume_range = (1000, 100000)
-    difficulty_range = (0, 100)
-    cpc_range = (0.5, 10.0)
-    
-    # Generate random data within ranges
-    seo_data = {
-        "search_volume": random.randint(*search_volume_range),
-        "keyword_difficulty": random.randint(*difficulty_range),
-        "avg_cpc": round(random.uniform(*cpc_range), 2)
-    }
-    
-    return seo_data
\ No newline at end of file
+    seo_data = get_seo_data_many([keyword]).get(keyword)
+    if seo_data is None:
+        raise KeyError(f"No SEO data returned for keyword: {keyword}")
+    return seo_data
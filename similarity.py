@@ -0,0 +1,209 @@
+import hashlib
+import math
+import re
+import struct
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set
+
+# Bump when normalization or hashing changes so stored topic indexes are rebuilt
+TOPIC_VERSION = "1"
+
+# Words that do not change what a post is about ("best wireless earbuds" covers "wireless earbuds")
+TOPIC_STOPWORDS = frozenset("""
+    a an and are as at best by can do does for from guide guides how i in is it my of on or review reviews
+    should the to top ultimate vs versus what when which why with you your
+""".split())
+_YEAR = re.compile(r"(?:19|20)\d\d")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# MinHash signature length and LSH banding: two topics whose features overlap by 80% share a
+# band (and so are compared) with probability 1 - (1 - 0.8**4)**16, about 99.97%; at 50% about 64%
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+# Candidates must share enough bands that a topic exactly at the threshold still qualifies this often
+LSH_RECALL = 0.99
+_SIGNATURE = struct.Struct(f"<{NUM_PERMUTATIONS}I")
+# Trigram overlap at which two words count as spellings of the same word ("learnin" and "learning")
+TYPO_SIMILARITY = 0.5
+
+
+def _stem(token: str) -> str:
+    """Crude plural folding, applied identically to both sides of a comparison."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def topic_key(keyword: str) -> str:
+    """
+    Normalizes a keyword (or a sanitized storage key) to the topic it asks for.
+
+    Case, punctuation, word order, years, plurals and filler words such as
+    "best" or "guide" are dropped, so "Wireless Earbuds 2026", "best wireless
+    earbuds" and "wireless-earbuds" all map to "earbud wireless".
+
+    Args:
+        keyword (str): Keyword as typed, or a sanitized post key
+
+    Returns:
+        str: Sorted, space-separated topic words ("" for a keyword without words)
+    """
+    tokens = _TOKEN.findall(keyword.lower())
+    words = [token for token in tokens if token not in TOPIC_STOPWORDS and not _YEAR.fullmatch(token)]
+    # A keyword made only of filler words ("the best") is its own topic
+    return " ".join(sorted({_stem(token) for token in (words or tokens)}))
+
+
+@lru_cache(maxsize=4096)
+def topic_features(topic: str) -> FrozenSet[str]:
+    """Shingles of a topic key: each word plus its character trigrams, so near-spellings overlap."""
+    features: Set[str] = set()
+    for word in topic.split():
+        features.add(word)
+        if not word.isdigit():
+            padded = f"^{word}$"
+            features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(features)
+
+
+def _numbers(topic: str) -> str:
+    return " ".join(word for word in topic.split() if word.isdigit())
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def _same_words(a: str, b: str) -> bool:
+    """
+    Whether two topic keys name the same words, up to spelling.
+
+    Shared words pair up first; each remaining word must pair with a distinct
+    word of the other topic whose character trigrams overlap by at least
+    TYPO_SIMILARITY. Any word left over is a qualifier ("jobs", "for kids",
+    "tax") that makes the topic a different one.
+    """
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    rest_a, rest_b = set(words_a) - set(words_b), set(words_b) - set(words_a)
+    for word in sorted(rest_a):
+        trigrams = topic_features(word) - {word}
+        spellings = [(_jaccard(trigrams, topic_features(other) - {other}), other) for other in rest_b]
+        similarity, other = max(spellings, default=(0.0, None))
+        if similarity < TYPO_SIMILARITY:
+            return False
+        rest_b.discard(other)
+    return True
+
+
+def topic_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two topic keys, from 0.0 to 1.0.
+
+    Topics must name the same content words: a topic with an extra word
+    ("machine learning jobs" against "machine learning") or a different one
+    ("wireless earbuds kids" against "wireless earbuds") scores 0.0, as do
+    topics naming different numbers ("iphone 14" and "iphone 15"). Otherwise
+    the score is the Jaccard similarity of their shingles, which only falls
+    below 1.0 when a word is spelled differently.
+    """
+    if a == b:
+        return 1.0
+    if _numbers(a) != _numbers(b) or not _same_words(a, b):
+        return 0.0
+    return _jaccard(topic_features(a), topic_features(b))
+
+
+def minhash(features: FrozenSet[str]) -> List[int]:
+    """
+    MinHash signature (NUM_PERMUTATIONS values) of a feature set, stable across processes.
+
+    One SHAKE-128 digest per feature supplies all of its hash values at once,
+    and the signature is their element-wise minimum, so the per-permutation
+    work happens in C rather than in a Python loop.
+    """
+    if not features:
+        return [0] * NUM_PERMUTATIONS
+    return list(map(min, zip(*(_SIGNATURE.unpack(hashlib.shake_128(feature.encode("utf-8")).digest(_SIGNATURE.size))
+                               for feature in features))))
+
+
+def lsh_buckets(topic: str) -> List[int]:
+    """
+    LSH bucket ids of a topic key, one per band of its MinHash signature.
+
+    Topics sharing any bucket are candidates for ``topic_similarity``; the ids
+    are signed 64-bit integers so they fit an SQLite INTEGER column. The
+    topic's numbers are part of every id: topics with different numbers never
+    match, and without them "model 1" ... "model 50000" would all share buckets.
+    """
+    signature = minhash(topic_features(topic))
+    numbers = _numbers(topic).encode("ascii")
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<{LSH_ROWS + 1}I", band, *rows) + numbers, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+@lru_cache(maxsize=64)
+def min_shared_buckets(threshold: float) -> int:
+    """
+    Number of LSH buckets a stored topic must share with a query to be scored.
+
+    The largest count that a topic exactly at ``threshold`` still reaches with
+    probability LSH_RECALL (at least 1). Requiring it drops most of the
+    candidates that share a band by chance: at 0.8 two bands are required,
+    which a topic at 50% similarity reaches only about a quarter of the time.
+    """
+    p = max(0.0, min(threshold, 1.0)) ** LSH_ROWS
+    required = 1
+    while required < LSH_BANDS:
+        # P(at least required + 1 of LSH_BANDS bands match) for a topic at the threshold
+        tail = sum(math.comb(LSH_BANDS, k) * p ** k * (1 - p) ** (LSH_BANDS - k)
+                   for k in range(required + 1, LSH_BANDS + 1))
+        if tail < LSH_RECALL:
+            break
+        required += 1
+    return required
+
+
+class TopicIndex:
+    """
+    In-memory LSH index of topic keys, for keyword lists that are not stored yet.
+
+    ``PostStore.find_similar`` does the same lookup against stored posts; this
+    index lets a batch also skip keywords that duplicate one accepted earlier
+    in the same run.
+    """
+
+    def __init__(self):
+        self._topics: Dict[str, str] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+
+    def add(self, key: str, keyword: str):
+        topic = topic_key(keyword)
+        self._topics[key] = topic
+        for bucket in lsh_buckets(topic):
+            self._buckets.setdefault(bucket, set()).add(key)
+
+    def find(self, keyword: str, threshold: float) -> Optional[Dict]:
+        """Returns the most similar indexed entry as {'keyword', 'similarity'} if it reaches ``threshold``, else None."""
+        topic = topic_key(keyword)
+        shared: Dict[str, int] = {}
+        for bucket in lsh_buckets(topic):
+            for key in self._buckets.get(bucket, ()):
+                shared[key] = shared.get(key, 0) + 1
+        required = min_shared_buckets(threshold)
+        best = None
+        for key in (key for key, count in shared.items() if count >= required):
+            similarity = topic_similarity(topic, self._topics[key])
+            if similarity >= threshold and (best is None or similarity > best["similarity"]):
+                best = {"keyword": key, "similarity": similarity}
+        return best
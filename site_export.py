@@ -0,0 +1,257 @@
+import argparse
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = ".export-manifest.json"
+LOCK_FILE = ".export.lock"
+
+
+class SiteExporter:
+    """
+    Writes the rendered site to a directory that nginx can serve without Python.
+
+    The layout mirrors the URLs: ``index.html`` for ``/``,
+    ``post/<keyword>.html`` for ``/post/<keyword>`` and
+    ``reviews/<keyword>.html`` for ``/reviews/<keyword>``.
+
+    Exports are incremental. A manifest records the content hash and review
+    version each page was rendered from, plus the template fingerprint.
+    Only pages whose inputs changed are rendered again, and pages of deleted
+    posts are removed.
+
+    Pages are rendered to temporary files without any lock. An exclusive file
+    lock is held only to publish them: re-read the manifest, rename the files
+    into place and write the manifest. So exports from several workers or
+    processes never wait for each other's rendering. A page whose post changed
+    while it was rendered is not published, because the export queued by that
+    change renders it again.
+    """
+
+    def __init__(self, output_dir: str, post_store, review_store,
+                 render_post: Callable[[str], Optional[str]],
+                 render_reviews: Callable[[str], str],
+                 render_index: Callable[[], str],
+                 fingerprint: str = ""):
+        self.output_dir = output_dir
+        self.post_store = post_store
+        self.review_store = review_store
+        self.render_post = render_post
+        self.render_reviews = render_reviews
+        self.render_index = render_index
+        self.fingerprint = fingerprint
+        os.makedirs(os.path.join(output_dir, "post"), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, "reviews"), exist_ok=True)
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.output_dir, *parts)
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self._path(MANIFEST_FILE), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        if manifest.get("fingerprint") != self.fingerprint:
+            # Templates changed (or first export): every page has to be rendered again
+            manifest = {"fingerprint": self.fingerprint, "posts": {}, "index": None}
+        return manifest
+
+    @contextmanager
+    def _locked(self):
+        with open(self._path(LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _stage(self, html: str, *parts: str) -> Tuple[str, str]:
+        """Writes a page to a hidden temporary file next to its destination; returns (temporary path, path)."""
+        path = self._path(*parts)
+        fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(html)
+        return tmp_path, path
+
+    def _write(self, html: str, *parts: str):
+        """Writes a file atomically, so nginx never serves a half-written one."""
+        os.replace(*self._stage(html, *parts))
+
+    def _remove(self, keyword: str):
+        for path in (self._path("post", f"{keyword}.html"), self._path("reviews", f"{keyword}.html")):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _inputs(self, keyword: str) -> Optional[Dict]:
+        """What a post's pages are rendered from (content hash, review version, SEO data or not); None if the post is gone."""
+        info = self.post_store.get_info(keyword)
+        if info is None:
+            return None
+        return {"content_hash": info["content_hash"], "review_version": self.review_store.summary(keyword)["version"],
+                "has_seo_data": info["has_seo_data"]}
+
+    def export(self, keywords: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Brings the exported site up to date.
+
+        Args:
+            keywords (Optional[Iterable[str]]): Only check these posts (e.g. the one just generated
+                or reviewed); None checks every post and removes pages of posts that no longer exist
+
+        Returns:
+            Dict[str, int]: Counts of rendered, unchanged and removed posts
+        """
+        stats = {"rendered": 0, "unchanged": 0, "removed": 0}
+        # The manifest is replaced atomically, so a snapshot can be read without the lock
+        manifest = self._load_manifest()
+        if keywords is None:
+            keywords = set(self.post_store.keys()) | set(manifest["posts"])
+
+        staged: List[Tuple[str, Dict, List[Tuple[str, str]]]] = []
+        removed: List[str] = []
+        index = None
+        try:
+            for keyword in dict.fromkeys(keywords):
+                inputs = self._inputs(keyword)
+                if inputs is None:
+                    if keyword in manifest["posts"]:
+                        removed.append(keyword)
+                    continue
+                # A page exported without SEO data is rendered again, which retries the backfill
+                if manifest["posts"].get(keyword) == inputs and inputs["has_seo_data"]:
+                    stats["unchanged"] += 1
+                    continue
+                # The post page shows the newest reviews too, so a review change re-renders both pages
+                html = self.render_post(keyword)
+                if html is None:
+                    continue
+                pages = [self._stage(html, "post", f"{keyword}.html")]
+                staged.append((keyword, inputs, pages))  # Listed before the next render, so a failure cleans it up
+                pages.append(self._stage(self.render_reviews(keyword), "reviews", f"{keyword}.html"))
+
+            store_version = self.post_store.version()["version"]
+            if manifest.get("index") != store_version:
+                index = self._stage(self.render_index(), "index.html")
+
+            with self._locked():
+                manifest = self._load_manifest()
+                for keyword, inputs, pages in staged:
+                    # Skip pages another export already published, or whose post changed while rendering
+                    if manifest["posts"].get(keyword) == inputs or self._inputs(keyword) != inputs:
+                        continue
+                    for tmp_path, path in pages:
+                        os.replace(tmp_path, path)
+                    manifest["posts"][keyword] = inputs
+                    stats["rendered"] += 1
+                for keyword in removed:
+                    if self.post_store.get_info(keyword) is None and manifest["posts"].pop(keyword, None) is not None:
+                        self._remove(keyword)
+                        stats["removed"] += 1
+                if index and manifest.get("index") != store_version \
+                        and self.post_store.version()["version"] == store_version:
+                    os.replace(*index)
+                    manifest["index"] = store_version
+
+                manifest["exported_at"] = time.time()
+                self._write(json.dumps(manifest), MANIFEST_FILE)
+        finally:
+            # Pages that were not published
+            for tmp_path, _ in [page for _, _, pages in staged for page in pages] + ([index] if index else []):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return stats
+
+
+class ExportQueue:
+    """
+    Runs exports on one background thread, so writes never wait for rendering.
+
+    Requests that arrive while an export is running are merged: their
+    keywords are collected into one follow-up export, and a full export
+    absorbs any keyword requests pending with it.
+    """
+
+    def __init__(self, export: Callable[[Optional[List[str]]], Any]):
+        """
+        Args:
+            export (Callable[[Optional[List[str]]], Any]): Exports the given keywords (all posts for None)
+        """
+        self.export = export
+        self._cond = threading.Condition()
+        self._keywords: Set[str] = set()
+        self._full = False
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+
+    def request(self, keywords: Optional[Iterable[str]] = None):
+        """Queues an export of these keywords (None: every post) and returns at once."""
+        with self._cond:
+            if keywords is None:
+                self._full = True
+            else:
+                self._keywords.update(keywords)
+            # Threads do not survive a fork, e.g. from the gunicorn master into a worker
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._busy = False
+                self._thread = threading.Thread(target=self._run, name="site-export", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every queued export has run (e.g. before a CLI process exits); False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not (self._busy or self._full or self._keywords), timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._full or self._keywords)
+                keywords = None if self._full else sorted(self._keywords)
+                self._full = False
+                self._keywords = set()
+                self._busy = True
+            try:
+                self.export(keywords)
+            except Exception as e:
+                logger.error(f"Error exporting static site: {str(e)}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+def main(argv=None) -> int:
+    """CLI entry point: python site_export.py [--output DIR] [--keyword KEYWORD ...]"""
+    parser = argparse.ArgumentParser(description="Export rendered blog pages as static HTML.")
+    parser.add_argument("--output", help="Export directory (default: STATIC_EXPORT_DIR or ./site)")
+    parser.add_argument("--keyword", action="append", help="Only export these (sanitized) keywords")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and render every page")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.output:
+        os.environ["STATIC_EXPORT_DIR"] = args.output
+    os.environ.setdefault("STATIC_EXPORT_DIR", "site")
+
+    # The Flask app module owns the stores, templates and page renderers
+    import app as blog_app
+
+    if args.full:
+        manifest_path = os.path.join(os.environ["STATIC_EXPORT_DIR"], MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+    summary = blog_app.export_static_site(args.keyword)
+    print(json.dumps(summary))
+    return 0 if summary is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
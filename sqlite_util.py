@@ -0,0 +1,33 @@
+import sqlite3
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Opens a connection the way the stores share them: autocommit (transactions
+    are explicit, see ``transaction``), rows as ``sqlite3.Row``, WAL mode so
+    readers never block on a writer, and ``synchronous=NORMAL``, which is
+    durable in WAL mode except for the last commits before a power loss.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class transaction:
+    """Context manager wrapping BEGIN IMMEDIATE / COMMIT / ROLLBACK on an autocommit connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
@@ -0,0 +1,40 @@
+import time
+
+from jobs import FAILED, QUEUED, RUNNING, JobQueue
+
+
+def orphan(queue, job_id):
+    """Forgets a claimed job, as if the process running it had died."""
+    queue._running.discard(job_id)
+    time.sleep(0.01)
+
+
+def test_claim_returns_the_running_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), handler=dict, max_workers=0, max_running=1)
+    job, created = queue.submit("rose pruning")
+
+    claimed = queue._claim_next()
+
+    assert created and job["status"] == QUEUED and job["attempts"] == 0
+    assert claimed["id"] == job["id"]
+    assert claimed["status"] == RUNNING
+    assert claimed["attempts"] == 1
+    queue.stop()
+
+
+def test_orphaned_job_fails_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), handler=dict, max_workers=0, max_running=1,
+                     stale_after=0.0, max_attempts=2)
+    job, _ = queue.submit("rose pruning")
+
+    first = queue._claim_next()
+    orphan(queue, first["id"])
+    second = queue._claim_next()
+    orphan(queue, second["id"])
+
+    assert second["attempts"] == 2
+    assert queue._claim_next() is None
+    failed = queue.get(job["id"])
+    assert failed["status"] == FAILED
+    assert "Interrupted 2 times" in failed["error"]
+    queue.stop()
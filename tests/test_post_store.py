@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from post_parser import parse_post
+from post_store import PostStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PostStore(str(tmp_path / "blog_posts.db"), title_fn=lambda content: parse_post(content)["title"])
+
+
+def test_search_ranks_every_match(store):
+    # The best match is the oldest post, behind more matches than any fixed window of recent posts
+    store.put("composting-guide", "# Composting Guide\n\nHow composting works in a small garden.")
+    store.put_many({f"garden-note-{i}": f"# Garden Note {i}\n\nA note that mentions composting once."
+                    for i in range(1200)})
+
+    found = store.search("composting")
+
+    assert found["total"] == 1201
+    assert found["results"][0]["keyword"] == "composting-guide"
+
+
+def test_search_breaks_ties_newest_first(store):
+    store.put("first", "# Note\n\nPruning roses.")
+    time.sleep(0.01)
+    store.put("second", "# Note\n\nPruning roses.")
+
+    found = store.search("pruning")
+
+    assert [result["keyword"] for result in found["results"]] == ["second", "first"]
+
+
+def test_search_pages(store):
+    store.put_many({f"note-{i}": f"# Note {i}\n\nMulching." for i in range(25)})
+
+    pages = [store.search("mulching", limit=10, offset=offset)["results"] for offset in (0, 10, 20)]
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert len({result["keyword"] for page in pages for result in page}) == 25
+
+
+def test_put_takes_title_from_rendering(tmp_path):
+    def title_fn(content):
+        raise AssertionError("title_fn called for a rendered post")
+
+    store = PostStore(str(tmp_path / "blog_posts.db"), title_fn=title_fn,
+                      render_fn=lambda content: dict(parse_post(content), body=None))
+    store.put("rose-pruning", "# Rose Pruning ##\n\nCut above an outward-facing bud.")
+
+    assert store.search("pruning")["results"][0]["title"] == "Rose Pruning"
+
+
+def test_rendered_cache_follows_content(tmp_path):
+    store = PostStore(str(tmp_path / "blog_posts.db"), render_fn=parse_post, rendered_cache_size=1)
+    store.put("roses", "# Roses\n\nFirst.")
+    first = store.get_rendered("roses")
+
+    assert store.get_rendered("roses", store.get_info("roses")["content_hash"]) is first
+    store.put("roses", "# Roses Revised\n\nSecond.")
+    assert store.get_rendered("roses")["title"] == "Roses Revised"
+    store.delete("roses")
+    assert store.get_rendered("roses") is None
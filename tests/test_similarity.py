@@ -0,0 +1,56 @@
+import pytest
+
+from post_store import PostStore
+from similarity import TopicIndex, topic_key, topic_similarity
+
+# app.DUPLICATE_THRESHOLD's default (importing app would open its data files)
+DUPLICATE_THRESHOLD = 0.9
+
+
+def similarity(a, b):
+    return topic_similarity(topic_key(a), topic_key(b))
+
+
+@pytest.mark.parametrize("new, stored", [
+    ("machine learning jobs", "machine learning"),
+    ("machine learning for kids", "machine learning"),
+    ("wireless earbuds for kids", "wireless earbuds review"),
+    ("electric car tax", "electric car"),
+    ("electric car", "electric cat"),
+    ("iphone 14", "iphone 15"),
+])
+def test_different_topics_are_not_duplicates(new, stored):
+    assert similarity(new, stored) < DUPLICATE_THRESHOLD
+
+
+@pytest.mark.parametrize("new, stored", [
+    ("best wireless earbuds 2026", "wireless-earbuds"),
+    ("Wireless Earbuds Guide", "wireless earbud"),
+    ("home workouts", "home workout"),
+    ("learning machine", "machine learning"),
+])
+def test_same_topics_are_duplicates(new, stored):
+    assert similarity(new, stored) >= DUPLICATE_THRESHOLD
+
+
+def test_misspellings_score_below_one():
+    assert 0.7 < similarity("kubernets deployment strategy", "kubernetes deployment strategies") < 1.0
+    assert 0.7 < similarity("machine learnin", "machine learning") < 1.0
+
+
+def test_find_similar_skips_qualified_topics(tmp_path):
+    store = PostStore(str(tmp_path / "blog_posts.db"))
+    store.put_many({"machine-learning": "# Machine Learning", "wireless-earbuds-review": "# Earbuds"})
+
+    assert store.find_similar("machine learning jobs", DUPLICATE_THRESHOLD) == []
+    assert store.find_similar("wireless earbuds for kids", DUPLICATE_THRESHOLD) == []
+    assert store.find_similar("best machine learning", DUPLICATE_THRESHOLD) == [
+        {"keyword": "machine-learning", "similarity": 1.0}]
+
+
+def test_topic_index_skips_qualified_topics():
+    index = TopicIndex()
+    index.add("electric-car", "electric car")
+
+    assert index.find("electric car tax", DUPLICATE_THRESHOLD) is None
+    assert index.find("electric cars", DUPLICATE_THRESHOLD)["keyword"] == "electric-car"